@@ -0,0 +1,80 @@
+"""Compare AuthSystem storage backends (JSON file vs SQLite) at 10k and 100k users.
+
+For each backend and user count, the store is pre-populated outside the timed
+section, then the hot-path operations are timed: usage-limit checks (lookups)
+and usage increments (writes).
+
+Usage: python bench_auth_storage.py [--users 10000 100000] [--ops 50]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime
+
+from utils.user_store import USER_FIELDS, JSONUserStore, SQLiteUserStore
+
+
+def make_record():
+    now = datetime.now().isoformat()
+    return {
+        'password': 'x' * 64,
+        'email': 'user@example.com',
+        'plan': 'free',
+        'created_at': now,
+        'usage_count': 0,
+        'max_uses': 5,
+        'last_reset': now,
+    }
+
+
+def populate(backend, directory, n_users):
+    """Create a store with n_users users, written in bulk"""
+    users = {f"user{i}": make_record() for i in range(n_users)}
+    if backend == 'json':
+        path = os.path.join(directory, 'users.json')
+        with open(path, 'w') as f:
+            json.dump(users, f, indent=2)
+        return JSONUserStore(path)
+
+    store = SQLiteUserStore(os.path.join(directory, 'users.db'))
+    conn = store._connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO users (username, " + ", ".join(USER_FIELDS) + ")"
+            " VALUES (?, " + ", ".join("?" for _ in USER_FIELDS) + ")",
+            [(username,) + tuple(user[field] for field in USER_FIELDS) for username, user in users.items()],
+        )
+    return store
+
+
+def time_ops(operation, usernames):
+    start = time.perf_counter()
+    for username in usernames:
+        operation(username)
+    return (time.perf_counter() - start) / len(usernames) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--ops", type=int, default=50, help="timed operations per measurement")
+    args = parser.parse_args()
+
+    print(f"{'backend':<8} {'users':>8} {'lookup ms':>10} {'increment ms':>13}")
+    for n_users in args.users:
+        for backend in ('json', 'sqlite'):
+            with tempfile.TemporaryDirectory() as directory:
+                store = populate(backend, directory, n_users)
+                usernames = [f"user{random.randrange(n_users)}" for _ in range(args.ops)]
+                lookup_ms = time_ops(store.get, usernames)
+                increment_ms = time_ops(store.increment_usage, usernames)
+                print(f"{backend:<8} {n_users:>8} {lookup_ms:>10.3f} {increment_ms:>13.3f}")
+                sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark k-nearest comps lookups against a synthetic store.
+
+Fills a temporary CompsStore with random listings, then times index build
+and nearest() queries (the path used to pre-fill the form and the prompt).
+
+Usage: python bench_comps_index.py [--rows 100000 1000000] [--queries 200] [--k 3]
+"""
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+from utils.comps_store import CompsStore, CompsIndex, PROPERTY_TYPES
+
+
+def populate(store, n_rows, rng):
+    store.append_columns({
+        'price': rng.lognormal(12.5, 0.5, n_rows),
+        'rent': rng.lognormal(7.6, 0.3, n_rows),
+        'sqft': rng.lognormal(7.3, 0.3, n_rows),
+        'bedrooms': rng.integers(1, 6, n_rows).astype(float),
+        'bathrooms': rng.integers(2, 8, n_rows) / 2,
+        'year_built': rng.integers(1900, 2024, n_rows).astype(float),
+        'property_type': rng.integers(0, len(PROPERTY_TYPES), n_rows).astype(float),
+    })
+
+
+def random_target(rng):
+    return {
+        'price': float(rng.lognormal(12.5, 0.5)),
+        'sqft': float(rng.lognormal(7.3, 0.3)),
+        'bedrooms': int(rng.integers(1, 6)),
+        'bathrooms': int(rng.integers(2, 8)) / 2,
+        'year_built': int(rng.integers(1900, 2024)),
+        'property_type': PROPERTY_TYPES[int(rng.integers(0, len(PROPERTY_TYPES)))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>10} {'build s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for n_rows in args.rows:
+        with tempfile.TemporaryDirectory() as directory:
+            store = CompsStore(directory)
+            populate(store, n_rows, rng)
+
+            index = CompsIndex(store)
+            start = time.perf_counter()
+            index.refresh()
+            build_seconds = time.perf_counter() - start
+
+            targets = [random_target(rng) for _ in range(args.queries)]
+            timings = []
+            for target in targets:
+                start = time.perf_counter()
+                index.nearest(target, k=args.k)
+                timings.append((time.perf_counter() - start) * 1000)
+            p50, p95 = np.percentile(timings, [50, 95])
+            print(f"{n_rows:>10} {build_seconds:>8.2f} {p50:>8.3f} {p95:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Import-time benchmark: what app.py costs to import before the first page renders.
+
+Runs `python -X importtime` in a fresh process that imports streamlit and then
+every module app.py imports at module level (read from app.py itself, so new
+imports are picked up automatically). Fails if the app's own imports take
+longer than --max-ms, or if a module that should load lazily (pandas, numpy,
+provider SDKs, pkg_resources) is pulled in at startup.
+
+Usage: python bench_imports.py [--max-ms 150] [--runs 3] [--top 10]
+"""
+import os
+import ast
+import sys
+import argparse
+import statistics
+import subprocess
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Heavy modules that must only load on first use
+LAZY_MODULES = ("pandas", "numpy", "pyarrow", "google.generativeai", "openai", "pkg_resources", "httpx")
+
+
+def app_imports(path):
+    """Modules imported at the top level of a script (imports inside functions are lazy by design)"""
+    with open(path, 'r') as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    return modules
+
+
+def parse_importtime(stderr):
+    """Yield (cumulative_us, depth, module) for each `-X importtime` line"""
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        cumulative_us = int(fields[1])
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        yield cumulative_us, depth, name.strip()
+
+
+def measure(modules):
+    """Import streamlit, then the app's modules; returns (streamlit_ms, app_ms, modules the app loaded, top-level costs)"""
+    code = "import streamlit\n" + "".join(f"import {module}\n" for module in modules if module != "streamlit")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=APP_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing the app's modules failed:\n{result.stderr[-2000:]}")
+
+    streamlit_ms = None
+    app_ms = 0.0
+    loaded = set()
+    top_level = []
+    for cumulative_us, depth, name in parse_importtime(result.stderr):
+        if streamlit_ms is not None:
+            # Interpreter startup and streamlit come first; only modules streamlit didn't
+            # already load show up after it, so these are what the app itself pulls in
+            loaded.add(name)
+        if depth != 0:
+            continue
+        if name == "streamlit":
+            streamlit_ms = cumulative_us / 1000
+        elif streamlit_ms is not None:
+            app_ms += cumulative_us / 1000
+            top_level.append((cumulative_us / 1000, name))
+    return streamlit_ms, app_ms, loaded, top_level
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-ms", type=float, default=150.0,
+                        help="fail if the app's own imports (beyond streamlit) take longer (median of runs)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="how many of the slowest imports to list")
+    args = parser.parse_args()
+
+    modules = app_imports(os.path.join(APP_DIR, "app.py"))
+    print(f"app.py imports at startup: {', '.join(modules)}")
+
+    runs = [measure(modules) for _ in range(args.runs)]
+    streamlit_ms = statistics.median(run[0] for run in runs)
+    app_ms = statistics.median(run[1] for run in runs)
+    loaded = runs[-1][2]
+
+    print(f"streamlit:        {streamlit_ms:8.1f} ms")
+    print(f"app modules:      {app_ms:8.1f} ms (limit {args.max_ms:.0f} ms)")
+    print("slowest top-level imports (last run):")
+    for ms, name in sorted(runs[-1][3], reverse=True)[:args.top]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    failures = []
+    eager = [module for module in LAZY_MODULES if module in loaded]
+    if eager:
+        failures.append(f"imported at startup but should load lazily: {', '.join(eager)}")
+    if app_ms > args.max_ms:
+        failures.append(f"app imports took {app_ms:.1f} ms (> {args.max_ms:.0f} ms)")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ Import time within budget")
+
+
+if __name__ == "__main__":
+    main()
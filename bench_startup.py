@@ -0,0 +1,71 @@
+"""Cold-start benchmark: time from a fresh process to the first rendered page.
+
+Each run starts a new Python process (so @st.cache_resource is empty, like the
+first visitor after a deploy) and renders app.py once with Streamlit's AppTest.
+
+Usage: python bench_startup.py [--runs 5] [--output bench_output.txt]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CHILD_SCRIPT = r"""
+import sys, time, json
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=300)
+app.run()
+first_paint = time.perf_counter() - start
+print(json.dumps({
+    "first_paint": first_paint,
+    "exceptions": [str(e.value) for e in app.exception],
+}))
+"""
+
+
+def run_once():
+    """Render app.py in a fresh interpreter and return its timings"""
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, os.path.join(APP_DIR, "app.py")],
+        cwd=APP_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # The app prints setup progress, so the JSON result is the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="append a one-line summary to this file")
+    args = parser.parse_args()
+
+    timings = []
+    for i in range(args.runs):
+        run = run_once()
+        timings.append(run["first_paint"])
+        status = "ok" if not run["exceptions"] else f"exceptions: {run['exceptions']}"
+        print(f"Run {i+1}: first paint in {run['first_paint']:.3f}s ({status})")
+
+    summary = (
+        f"{datetime.now().isoformat(timespec='seconds')} cold start to first paint: "
+        f"median {statistics.median(timings):.3f}s, "
+        f"min {min(timings):.3f}s, max {max(timings):.3f}s over {len(timings)} runs"
+    )
+    print(summary)
+
+    if args.output:
+        with open(args.output, "a") as f:
+            f.write(summary + "\n")
+
+
+if __name__ == "__main__":
+    main()
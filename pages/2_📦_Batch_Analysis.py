@@ -0,0 +1,224 @@
+import streamlit as st
+import time
+import pandas as pd
+
+from utils.resources import get_auth_system, get_ai_analyzer, get_history_store
+from utils.metrics_engine import compute_portfolio_metrics
+
+st.title("📦 Batch Portfolio Analysis")
+
+auth_system = get_auth_system()
+ai_analyzer = get_ai_analyzer()
+history = get_history_store()
+
+PROPERTY_COLUMNS = {
+    "address": "",
+    "bedrooms": 0,
+    "bathrooms": 0,
+    "square_feet": 0,
+    "property_type": "Single Family",
+    "year_built": "Unknown",
+    "purchase_price": 0,
+    "condition": "Unknown",
+}
+
+def load_batch(properties_df, comps_df):
+    """Turn the uploaded CSVs into (property_data, comps_data) pairs"""
+    properties_df = properties_df.copy()
+    if "property_id" not in properties_df.columns:
+        properties_df["property_id"] = range(1, len(properties_df) + 1)
+
+    comps_by_property = {}
+    if comps_df is not None:
+        for property_id, group in comps_df.groupby("property_id"):
+            comps_by_property[str(property_id)] = [
+                {
+                    "price": int(row.get("price", 0) or 0),
+                    "rent": int(row.get("rent", 0) or 0),
+                    "sqft": int(row.get("sqft", 0) or 0),
+                }
+                for row in group.fillna(0).to_dict("records")
+            ]
+
+    items = []
+    for row in properties_df.to_dict("records"):
+        property_data = {
+            column: row[column] if column in row and pd.notna(row[column]) else default
+            for column, default in PROPERTY_COLUMNS.items()
+        }
+        # CSV numbers come back as numpy types; keep the prompt formatting happy
+        for column in ("bedrooms", "square_feet", "purchase_price"):
+            property_data[column] = int(property_data[column] or 0)
+        property_data["bathrooms"] = float(property_data["bathrooms"] or 0)
+
+        comps_data = {"comparables": comps_by_property.get(str(row["property_id"]), [])}
+        items.append((row["property_id"], property_data, comps_data))
+    return items
+
+if not st.session_state.get("authenticated"):
+    st.warning("Please log in on the main page to run batch analyses.")
+    st.stop()
+
+username = st.session_state.username
+if auth_system.get_user(username) is None:
+    st.error("User session error. Please log in again.")
+    st.stop()
+
+st.write("""
+Upload a CSV of properties and, optionally, a CSV of comparables.
+
+- **Properties**: `property_id`, `address`, `bedrooms`, `bathrooms`, `square_feet`,
+  `property_type`, `year_built`, `purchase_price`, `condition`
+- **Comparables**: `property_id`, `price`, `rent`, `sqft`
+""")
+
+col1, col2 = st.columns(2)
+with col1:
+    properties_file = st.file_uploader("Properties CSV", type="csv")
+with col2:
+    comps_file = st.file_uploader("Comparables CSV", type="csv")
+
+col1, col2 = st.columns(2)
+with col1:
+    max_workers = st.slider("Concurrent analyses", min_value=1, max_value=16, value=4)
+with col2:
+    max_retries = st.slider("Retries per property", min_value=0, max_value=5, value=2)
+
+if properties_file is None:
+    st.stop()
+
+try:
+    properties_df = pd.read_csv(properties_file)
+    comps_df = pd.read_csv(comps_file) if comps_file is not None else None
+    batch = load_batch(properties_df, comps_df)
+except Exception as e:
+    st.error(f"Could not read the uploaded CSVs: {e}")
+    st.stop()
+
+st.write(f"**Properties loaded**: {len(batch)}")
+
+# Local Monte Carlo, no model calls (so it doesn't count against the plan)
+if st.button("🎲 Simulate Portfolio Risk", disabled=not batch):
+    from utils.monte_carlo import simulate_portfolio
+    priced = [(property_id, property_data, comps_data) for property_id, property_data, comps_data in batch
+              if property_data["purchase_price"] > 0]
+    with st.spinner(f"Simulating {len(priced)} properties across CPU cores..."):
+        start_time = time.time()
+        # One process per core: each simulation is CPU-bound NumPy work
+        simulations = simulate_portfolio(
+            [(property_data, comps_data) for _, property_data, comps_data in priced],
+            n_paths=20_000, years=10, seed=0,
+        )
+    st.dataframe(
+        pd.DataFrame([
+            {
+                "Property": property_id,
+                "Address": property_data["address"],
+                "IRR P5": simulation['irr']['p5'],
+                "IRR P50": simulation['irr']['p50'],
+                "IRR P95": simulation['irr']['p95'],
+                "NPV P50": simulation['npv']['p50'],
+                "Chance of Loss": simulation['loss_probability'],
+            }
+            for (property_id, property_data, _), simulation in zip(priced, simulations)
+        ]).round(2),
+        use_container_width=True, hide_index=True,
+    )
+    st.caption(f"10-year hold, 20,000 paths per property, simulated in {time.time() - start_time:.1f}s")
+
+# Free plans can only run as many analyses as they have left
+user = auth_system.get_user(username)
+# Applies the monthly reset to user first, so a stale usage_count doesn't shrink the batch
+auth_system.check_usage_limit(username, user)
+remaining_uses = max(0, user['max_uses'] - user['usage_count'])
+if len(batch) > remaining_uses:
+    st.warning(f"Only the first {int(remaining_uses)} properties fit in your remaining analyses.")
+    batch = batch[:int(remaining_uses)]
+
+if st.button("🚀 Analyze Portfolio", disabled=not batch):
+    # Rent and yield are computed locally for the whole portfolio in one pass
+    local_metrics = compute_portfolio_metrics(
+        pd.DataFrame([
+            {"row": i, "square_feet": property_data["square_feet"], "purchase_price": property_data["purchase_price"]}
+            for i, (_, property_data, _) in enumerate(batch)
+        ]),
+        pd.DataFrame(
+            [{"row": i, **comp} for i, (_, _, comps_data) in enumerate(batch) for comp in comps_data["comparables"]],
+            columns=["row", "price", "rent", "sqft"],
+        ),
+        key="row",
+    )
+    rows = [
+        {
+            "Property": property_id,
+            "Address": property_data["address"],
+            "Status": "⏳ Queued",
+            "Rent Estimate": f"${rent:,.0f}/mo" if pd.notna(rent) else "",
+            "Gross Yield": f"{gross_yield:.1f}%" if pd.notna(gross_yield) else "",
+            "Demand": "",
+            "Attempts": 0,
+            "Seconds": 0.0,
+        }
+        for (property_id, property_data, _), rent, gross_yield in zip(
+            batch, local_metrics["implied_rent"], local_metrics["gross_yield"]
+        )
+    ]
+    progress = st.progress(0.0)
+    throughput_placeholder = st.empty()
+    table_placeholder = st.empty()
+    table_placeholder.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+    analyses = {}
+    completed = 0
+    start_time = time.time()
+
+    results = ai_analyzer.analyze_batch(
+        [(property_data, comps_data) for _, property_data, comps_data in batch],
+        max_workers=max_workers,
+        max_retries=max_retries,
+    )
+    for result in results:
+        row = rows[result['index']]
+        row["Attempts"] = result['attempts']
+        row["Seconds"] = round(result['seconds'], 1)
+        if result['ok']:
+            row["Status"] = "✅ Done"
+            # Only fall back to numbers scraped from the text when the inputs couldn't give one
+            row["Rent Estimate"] = row["Rent Estimate"] or result['metrics']['rental_value']
+            row["Gross Yield"] = row["Gross Yield"] or result['metrics']['yield']
+            row["Demand"] = result['metrics']['demand']
+            # Offline estimates (no provider reachable) cost no model call
+            if result['result'].provider != 'offline':
+                try:
+                    auth_system.increment_usage(username)
+                except Exception as e:
+                    st.error(f"Error saving user data: {e}")
+            _, property_data, comps_data = batch[result['index']]
+            history.record(
+                username, property_data, comps_data, result['analysis'], result['metrics'],
+                provider=result['result'].provider, latency_seconds=result['seconds'], kind='structured'
+            )
+        else:
+            row["Status"] = "❌ Failed"
+        analyses[row["Property"]] = result['analysis']
+
+        completed += 1
+        elapsed = time.time() - start_time
+        progress.progress(completed / len(batch))
+        throughput_placeholder.metric("Throughput", f"{completed / elapsed * 60:.1f} analyses/min")
+        table_placeholder.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+    succeeded = sum(1 for row in rows if row["Status"] == "✅ Done")
+    st.success(f"Batch complete: {succeeded}/{len(rows)} succeeded in {time.time() - start_time:.1f}s")
+
+    st.download_button(
+        "Download Results CSV",
+        pd.DataFrame(rows).to_csv(index=False),
+        file_name="portfolio_analysis.csv",
+        mime="text/csv",
+    )
+
+    st.subheader("📊 Detailed Analyses")
+    for property_id, analysis in analyses.items():
+        with st.expander(f"Property {property_id}"):
+            st.write(analysis)
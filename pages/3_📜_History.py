@@ -0,0 +1,74 @@
+import streamlit as st
+from datetime import datetime
+
+from utils.resources import get_history_store
+
+st.title("📜 Analysis History")
+
+history = get_history_store()
+
+if not st.session_state.get("authenticated"):
+    st.warning("Please log in on the main page to see your analysis history.")
+    st.stop()
+
+username = st.session_state.username
+total = history.count(username)
+if total == 0:
+    st.info("No analyses yet. Analyses you run are saved here automatically.")
+    st.stop()
+
+page_size = st.selectbox("Per page", [10, 20, 50], index=1)
+
+# Keyset pagination: keep the cursor each page started from, so Newer can step back
+if 'history_cursors' not in st.session_state or st.session_state.get('history_page_size') != page_size:
+    st.session_state.history_cursors = [None]
+    st.session_state.history_page_size = page_size
+cursors = st.session_state.history_cursors
+
+entries = history.page(username, limit=page_size, before=cursors[-1])
+page_number = len(cursors)
+st.caption(f"{total} analyses saved · page {page_number} of {(total + page_size - 1) // page_size}")
+
+rows = [
+    {
+        "ID": entry['id'],
+        "Date": datetime.fromtimestamp(entry['created_at']).strftime("%Y-%m-%d %H:%M"),
+        "Address": entry['address'] or "Not specified",
+        "Price": f"${entry['purchase_price']:,.0f}" if entry['purchase_price'] else "",
+        "Rent": entry['metrics'].get('rental_value', ''),
+        "Yield": entry['metrics'].get('yield', ''),
+        "Demand": entry['metrics'].get('demand', ''),
+        "Provider": entry['provider'] or "",
+        "Seconds": round(entry['latency_seconds'], 1) if entry['latency_seconds'] is not None else None,
+    }
+    for entry in entries
+]
+st.dataframe(rows, use_container_width=True, hide_index=True)
+
+col1, col2 = st.columns(2)
+with col1:
+    if st.button("⬅️ Newer", disabled=page_number == 1):
+        cursors.pop()
+        st.rerun()
+with col2:
+    if st.button("Older ➡️", disabled=len(entries) < page_size):
+        cursors.append(history.cursor(entries[-1]))
+        st.rerun()
+
+if entries:
+    labels = {entry['id']: f"#{entry['id']} · {row['Date']} · {row['Address']}" for entry, row in zip(entries, rows)}
+    selected_id = st.selectbox("Open analysis", list(labels), format_func=labels.get)
+    entry = history.get(selected_id, username)
+    if entry is not None:
+        st.subheader("📈 Key Metrics")
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Estimated Rental Value", entry['metrics'].get('rental_value', 'See analysis'))
+        col2.metric("Gross Yield", entry['metrics'].get('yield', 'See analysis'))
+        col3.metric("Demand Level", entry['metrics'].get('demand', 'See analysis'))
+        col4.metric("Flip Potential", entry['metrics'].get('flip_potential', 'See analysis'))
+
+        st.subheader("📊 Detailed Analysis")
+        st.markdown(entry['analysis'])
+
+        with st.expander("Inputs"):
+            st.json({"property": entry['property_data'], "comps": entry['comps_data']})
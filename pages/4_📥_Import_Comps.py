@@ -0,0 +1,58 @@
+import streamlit as st
+
+from utils.resources import get_auth_system, get_comps_index
+
+st.title("📥 Import Comparable Properties")
+
+if not st.session_state.get("authenticated"):
+    st.warning("Please log in on the main page to import comparable properties.")
+    st.stop()
+
+# Imported comps are shared by every user's analyses, so only paid accounts may add to them
+if get_auth_system().get_user_plan(st.session_state.username) == 'free':
+    st.warning("Importing comparable properties is available on premium plans.")
+    st.stop()
+
+store = get_comps_index().store
+
+st.write("""
+Upload an MLS or listings export (CSV or Parquet). Imported listings are used to suggest comps,
+give the AI more market context and compare your property against the local market.
+
+Recognized columns (common MLS names work too): `price`, `rent`, `sqft`, `bedrooms`, `bathrooms`,
+`year_built`, `property_type`. Rows need a price; other columns are optional and unknown ones are ignored.
+""")
+st.caption(f"{store.count():,} properties saved so far")
+
+uploaded = st.file_uploader("Listings file", type=["csv", "parquet", "pq"])
+skip_existing = st.checkbox("Skip rows that are already saved", value=True)
+
+if uploaded is not None and st.button("📥 Import", type="primary"):
+    from utils.comps_import import import_comps
+
+    status = st.empty()
+
+    def show_progress(report):
+        status.info(
+            f"Read {report['rows_read']:,} rows · imported {report['rows_imported']:,} · "
+            f"{report['rows_per_second']:,.0f} rows/sec"
+        )
+
+    try:
+        # The file is parsed chunk by chunk and appended as it goes, so a large export never sits in a DataFrame
+        report = import_comps(uploaded, store, skip_existing=skip_existing, progress=show_progress)
+    except Exception as e:
+        status.empty()
+        st.error(f"Could not import {uploaded.name}: {e}")
+        st.stop()
+
+    status.success(f"✅ Imported {report['rows_imported']:,} of {report['rows_read']:,} rows from {uploaded.name}")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Imported", f"{report['rows_imported']:,}")
+    col2.metric("Duplicates Skipped", f"{report['rows_duplicate']:,}")
+    col3.metric("Invalid (no valid price)", f"{report['rows_invalid']:,}")
+    col4.metric("Rows/sec", f"{report['rows_per_second']:,.0f}")
+    st.caption(
+        "Columns used: " + ", ".join(f"{source} → {column}" for column, source in report['columns'].items())
+        + f" · {report['seconds']:.1f}s"
+    )
@@ -0,0 +1,122 @@
+"""Local stand-in for the Gemini and OpenAI REST APIs.
+
+Serves canned analyses so the AI client layer can be exercised without
+network access or quota:
+
+    python stub_ai_server.py --port 8765 --delay 0.5
+    GEMINI_BASE_URL=http://127.0.0.1:8765/v1beta \
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 streamlit run app.py
+
+Any API key is accepted except "bad-key" (401) and "quota-key" (429).
+"""
+import json
+import time
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_ANALYSIS = (
+    "**Estimated Rental Value**: $2,100 per month based on the comparables.\n\n"
+    "**Gross Rental Yield**: 8.4% yield at the asking price.\n\n"
+    "**Market Demand**: High demand for this property type in the area.\n\n"
+    "**Investment Recommendation**: Good opportunity with steady cash flow."
+)
+
+STUB_STRUCTURED_ANALYSIS = {
+    "rent_estimate": 2100,
+    "gross_yield": 8.4,
+    "demand": "High",
+    "recommendation": "Good",
+    "narrative": "Solid rental candidate: comparables support $2,100/month and the yield beats the area average.",
+}
+
+
+class StubAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse can be observed
+    delay = 0.0
+    chunk_size = 40
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_events(self, events):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for event in events:
+            data = f"data: {event}\n\n".encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+            time.sleep(self.delay / 10)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chunks(self):
+        return [STUB_ANALYSIS[i:i + self.chunk_size] for i in range(0, len(STUB_ANALYSIS), self.chunk_size)]
+
+    def _api_key(self):
+        key = self.headers.get("x-goog-api-key") or self.headers.get("Authorization", "")
+        return key.replace("Bearer ", "")
+
+    def do_GET(self):
+        # Model metadata, used as a cheap health probe
+        if self._api_key() == "bad-key":
+            self._send_json(401, {"error": {"message": "API key not valid"}})
+        elif self.path.startswith("/v1beta/models") or self.path.startswith("/v1/models"):
+            self._send_json(200, {"models": [{"name": "models/gemini-pro"}]})
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        api_key = self._api_key()
+        if api_key == "bad-key":
+            return self._send_json(401, {"error": {"message": "API key not valid"}})
+        if api_key == "quota-key":
+            return self._send_json(429, {"error": {"message": "Resource has been exhausted (e.g. check quota)."}})
+
+        time.sleep(self.delay)
+
+        if ":streamGenerateContent" in self.path:
+            events = [
+                json.dumps({"candidates": [{"content": {"parts": [{"text": chunk}]}}]})
+                for chunk in self._chunks()
+            ]
+            self._send_events(events)
+        elif ":generateContent" in self.path:
+            json_mode = request.get("generationConfig", {}).get("responseMimeType") == "application/json"
+            text = json.dumps(STUB_STRUCTURED_ANALYSIS) if json_mode else STUB_ANALYSIS
+            self._send_json(200, {"candidates": [{"content": {"parts": [{"text": text}]}}]})
+        elif self.path.endswith("/chat/completions"):
+            if request.get("stream"):
+                events = [json.dumps({"choices": [{"delta": {"content": chunk}}]}) for chunk in self._chunks()]
+                self._send_events(events + ["[DONE]"])
+            else:
+                self._send_json(200, {"choices": [{"message": {"role": "assistant", "content": STUB_ANALYSIS}}]})
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+
+def serve(port=8765, delay=0.0):
+    """Start the stub server in the foreground"""
+    StubAIHandler.delay = delay
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubAIHandler)
+    print(f"🧪 Stub AI server on http://127.0.0.1:{port} (delay {delay}s)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stub for the Gemini/OpenAI APIs")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds before each response")
+    args = parser.parse_args()
+    serve(args.port, args.delay)
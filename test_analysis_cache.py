@@ -0,0 +1,80 @@
+from utils.analysis_cache import AnalysisCache, make_approximate_key, make_cache_key
+
+PROPERTY = {"address": "12 Oak Street", "purchase_price": 300000, "square_feet": 1500, "bedrooms": 3}
+COMPS = {"comparables": [{"price": 310000, "rent": 2100, "sqft": 1450}, {"price": 290000, "rent": 1900, "sqft": 1400}]}
+
+
+def make_cache(tmp_path, **kwargs):
+    return AnalysisCache(db_file=str(tmp_path / "cache.db"), **kwargs)
+
+
+def test_cache_key_ignores_whitespace_and_integer_floats():
+    key = make_cache_key(PROPERTY, COMPS, "v1", {"temperature": 0.7})
+    same = make_cache_key(dict(PROPERTY, address="12  Oak Street ", square_feet=1500.0), COMPS, "v1", {"temperature": 0.7})
+    assert key == same
+    assert key != make_cache_key(PROPERTY, COMPS, "v2", {"temperature": 0.7})
+
+
+def test_memory_then_disk_tier(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set("k", "analysis")
+    assert cache.get("k") == "analysis"
+    assert cache.get_stats()["memory_hits"] == 1
+
+    # A new instance (another process) only has the disk tier
+    reopened = make_cache(tmp_path)
+    assert reopened.get("k") == "analysis"
+    assert reopened.get_stats()["disk_hits"] == 1
+    # The disk hit was promoted to memory
+    assert reopened.get("k") == "analysis"
+    assert reopened.get_stats()["memory_hits"] == 1
+
+
+def test_memory_lru_eviction(tmp_path):
+    cache = make_cache(tmp_path, max_memory_entries=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, key.upper())
+    assert list(cache._memory) == ["b", "c"]
+    assert cache.get_stats()["evictions"] == 1
+    # Evicted from memory only; the disk tier still answers
+    assert cache.get("a") == "A"
+
+
+def test_expired_entries_miss(tmp_path):
+    cache = make_cache(tmp_path, ttl_seconds=0)
+    cache.set("k", "old")
+    cache._memory["k"] = ("old", 0.0)
+    assert cache.get("k") is None
+    assert cache.get_stats()["misses"] == 1
+
+
+def test_fallback_fills_both_tiers(tmp_path):
+    asked = []
+
+    def fallback(key):
+        asked.append(key)
+        return "from history" if key == "k" else None
+
+    cache = make_cache(tmp_path, fallback=fallback)
+    assert cache.get("k") == "from history"
+    assert cache.get("k") == "from history"
+    assert asked == ["k"]
+    assert cache.get("other") is None
+    assert make_cache(tmp_path).get("k") == "from history"
+
+
+def test_approximate_key_buckets_prices_and_spellings():
+    key = make_approximate_key(PROPERTY, COMPS, "v1", {})
+    near = dict(PROPERTY, address="12 oak st.", purchase_price=301000)
+    reordered = {"comparables": list(reversed(COMPS["comparables"]))}
+    assert make_approximate_key(near, reordered, "v1", {}) == key
+    assert make_approximate_key(dict(PROPERTY, bedrooms=4), COMPS, "v1", {}) != key
+
+
+def test_approximate_lookup(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set("exact", "analysis", approximate_key="approx")
+    assert cache.lookup("exact", "approx") == ("analysis", False)
+    assert cache.lookup("other", "approx") == ("analysis", True)
+    assert cache.lookup("other", "missing") == (None, False)
+    assert cache.get_stats()["approximate_hits"] == 1
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from utils.analysis_result import AnalysisResult, parse_analysis_json
+
+PAYLOAD = {"rent_estimate": 2100, "gross_yield": 8.4, "demand": "high", "recommendation": "Good",
+           "narrative": "  Solid rental in a tight market.  "}
+
+
+def test_valid_json():
+    result = parse_analysis_json(json.dumps(PAYLOAD))
+    assert result == AnalysisResult(rent_estimate=2100.0, gross_yield=8.4, demand="High", recommendation="Good",
+                                    narrative="Solid rental in a tight market.")
+    assert result.ok and result.source == "json"
+    assert AnalysisResult.from_json(result.to_json()) == result
+
+
+def test_fenced_json_and_formatted_numbers():
+    text = "```json\n" + json.dumps(dict(PAYLOAD, rent_estimate="$2,100", gross_yield="8.4%")) + "\n```"
+    result = parse_analysis_json(text)
+    assert (result.rent_estimate, result.gross_yield) == (2100.0, 8.4)
+
+
+@pytest.mark.parametrize("value", ["NaN", "Infinity", "-Infinity"])
+def test_non_finite_numbers_are_rejected(value):
+    # json.loads accepts these bare tokens, and "nan" strings parse with float()
+    with pytest.raises(ValueError, match="finite"):
+        parse_analysis_json(json.dumps(PAYLOAD).replace("2100", value))
+    with pytest.raises(ValueError, match="finite"):
+        parse_analysis_json(json.dumps(dict(PAYLOAD, gross_yield=value.lower())))
+
+
+@pytest.mark.parametrize("text", [
+    json.dumps(dict(PAYLOAD, rent_estimate=True)),
+    json.dumps(dict(PAYLOAD, gross_yield=-1)),
+    json.dumps(dict(PAYLOAD, demand="Very High")),
+    json.dumps(dict(PAYLOAD, narrative=" ")),
+    "[1, 2]",
+    "Rent is about $2,100",
+])
+def test_schema_violations_are_rejected(text):
+    with pytest.raises(ValueError):
+        parse_analysis_json(text)
+
+
+def test_prose_recommendations_are_normalised():
+    metrics = {'rental_value': "$2,100/mo", 'yield': "8.4%", 'demand': "Medium", 'flip_potential': "Excellent"}
+    result = AnalysisResult.from_text("prose", metrics)
+    assert (result.rent_estimate, result.gross_yield, result.recommendation) == (2100.0, 8.4, "Good")
+    assert result.source == "regex"
+    assert AnalysisResult.from_text("prose", dict(metrics, flip_potential="Maybe")).recommendation is None
+    assert result.to_metrics()['flip_potential'] == "Good"
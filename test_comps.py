@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.comps_import import RowDeduplicator, import_comps, match_columns, row_hashes
+from utils.comps_store import COLUMNS, CompsIndex, CompsStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CompsStore(str(tmp_path / "comps"))
+
+
+def random_columns(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        'price': rng.uniform(100_000, 900_000, n).round(-3),
+        'rent': rng.uniform(800, 4000, n).round(),
+        'sqft': rng.uniform(600, 4000, n).round(),
+        'bedrooms': rng.integers(1, 6, n).astype(float),
+        'bathrooms': rng.integers(1, 4, n).astype(float),
+        'year_built': rng.integers(1900, 2024, n).astype(float),
+        'property_type': rng.integers(0, 4, n).astype(float),
+    }
+
+
+def brute_force_nearest(index, store, target, k):
+    columns = {column: np.asarray(values) for column, values in store.columns().items()}
+    keep = np.isfinite(columns['rent'])
+    block = {column: values[keep] for column, values in columns.items()}
+    distances = index._distances(block, target)
+    return sorted(distances)[:k]
+
+
+def test_append_records_and_columns(store):
+    assert store.count() == 0
+    added = store.append_records([
+        {'price': 300000, 'rent': 2000, 'sqft': 1500, 'property_type': 'Condo'},
+        {'price': None, 'rent': 1800},
+        {'price': '250000', 'bedrooms': 0},
+    ])
+    assert added == 2 and store.count() == 2
+    columns = store.columns()
+    assert list(columns['price']) == [300000.0, 250000.0]
+    assert columns['property_type'][0] == 1.0
+    # Zero and missing values are stored as NaN
+    assert np.isnan(columns['bedrooms']).all()
+
+
+def test_append_rejects_ragged_or_unknown_columns(store):
+    with pytest.raises(ValueError):
+        store.append_columns({'price': np.ones(2), 'rent': np.ones(3)})
+    with pytest.raises(ValueError):
+        store.append_columns({'price': np.ones(2), 'lot_size': np.ones(2)})
+
+
+def test_sorted_copy_is_persisted_and_shared(store):
+    store.append_columns(random_columns(500))
+    count, sorted_columns = store.write_sorted(store.count())
+    assert count == 500
+    assert np.all(np.diff(sorted_columns['price']) >= 0)
+    # Rows stay intact: each column was reordered with the same permutation
+    original = sorted(zip(*(store.columns()[column] for column in COLUMNS)))
+    assert sorted(zip(*(sorted_columns[column] for column in COLUMNS))) == original
+
+    # Another store object (another process) reuses the published copy
+    reopened = CompsStore(store.directory)
+    assert reopened.sorted_columns()[0] == 500
+
+
+def test_index_matches_brute_force(store):
+    store.append_columns(random_columns(3000))
+    index = CompsIndex(store, price_window=10.0, max_candidates=10_000, max_unsorted=100)
+    target = {'price': 420000, 'sqft': 1800, 'bedrooms': 3, 'bathrooms': 2, 'property_type': 'Condo'}
+    results = index.nearest(target, k=5)
+    assert [row['distance'] for row in results] == pytest.approx(brute_force_nearest(index, store, target, 5))
+    assert len(index) == 3000
+
+
+def test_index_picks_up_appended_rows(store):
+    store.append_columns(random_columns(200))
+    index = CompsIndex(store, max_unsorted=50)
+    assert len(index) == 200
+    assert index.refresh()[1] == 200
+
+    store.append_records([{'price': 512345, 'rent': 2777, 'sqft': 2000, 'bedrooms': 3}])
+    result = index.nearest({'price': 512345, 'sqft': 2000, 'bedrooms': 3}, k=1)[0]
+    assert (result['price'], result['rent']) == (512345, 2777)
+    # A small tail is scored by brute force instead of triggering a new sorted copy
+    assert index.refresh()[:2] == (201, 200)
+
+
+def test_nearest_skips_duplicates_and_excluded(store):
+    row = {'price': 300000, 'rent': 2000, 'sqft': 1500}
+    store.append_records([row, row, {'price': 310000, 'rent': 2100, 'sqft': 1550},
+                          {'price': 305000, 'rent': None, 'sqft': 1500}])
+    index = CompsIndex(store)
+    results = index.nearest(row, k=5)
+    assert [r['price'] for r in results] == [300000, 310000]
+    assert [r['price'] for r in index.nearest(row, k=5, exclude=[row])] == [310000]
+
+
+def test_window_returns_rows_in_the_price_window(store):
+    store.append_columns(random_columns(2000))
+    index = CompsIndex(store, price_window=0.1, max_unsorted=0)
+    block = index.window({'price': 500000})
+    assert len(block['price']) > 0
+    assert np.all((block['price'] >= 450000) & (block['price'] <= 550000))
+    assert np.isfinite(block['sqft']).all()
+
+
+def test_match_columns_prefers_earlier_aliases():
+    mapping = match_columns(["List Price", "Sale_Price ($)", "Beds", "Living Area", "Unknown"])
+    assert mapping == {'price': "Sale_Price ($)", 'bedrooms': "Beds", 'sqft': "Living Area"}
+
+
+def test_deduplicator():
+    columns = random_columns(5)
+    hashes = row_hashes(columns)
+    deduplicator = RowDeduplicator()
+    assert deduplicator.new_rows(np.concatenate([hashes, hashes[:2]])).tolist() == [True] * 5 + [False] * 2
+    assert not deduplicator.new_rows(hashes).any()
+    assert np.all(np.diff(deduplicator.seen.astype(np.float64)) > 0)
+
+
+def listings(n=100):
+    columns = random_columns(n, seed=1)
+    return pd.DataFrame({
+        'Sold Price': [f"${price:,.0f}" for price in columns['price']],
+        'Monthly Rent': columns['rent'],
+        'SqFt': columns['sqft'],
+        'Beds': columns['bedrooms'],
+        'Property Type': ['Single Family Residence', 'condominium', 'Townhome', 'Duplex'] * (n // 4),
+        'Agent': 'someone',
+    })
+
+
+def test_import_csv_cleans_and_dedupes(store, tmp_path):
+    df = listings()
+    df.loc[0, 'Sold Price'] = 'n/a'
+    df.loc[1, 'SqFt'] = 5
+    path = tmp_path / "export.csv"
+    pd.concat([df, df.iloc[10:20]]).to_csv(path, index=False)
+
+    report = import_comps(str(path), store, chunk_rows=30)
+    assert report['rows_read'] == 110
+    # Only the row without a price is dropped; the bad sqft becomes missing
+    assert report['rows_invalid'] == 1
+    assert report['rows_duplicate'] == 10
+    assert report['rows_imported'] == store.count() == 99
+    assert report['columns']['price'] == 'Sold Price'
+
+    columns = store.columns()
+    assert np.isnan(columns['sqft'][0])
+    assert set(np.unique(columns['property_type'])) == {0.0, 1.0, 2.0, 3.0}
+
+    # Importing the same file again adds nothing
+    again = import_comps(str(path), store)
+    assert again['rows_imported'] == 0 and again['rows_duplicate'] == 109
+
+
+def test_import_parquet(store, tmp_path):
+    path = tmp_path / "export.parquet"
+    listings().to_parquet(path, index=False)
+    report = import_comps(str(path), store, chunk_rows=40)
+    assert report['rows_imported'] == store.count() == 100
+
+
+def test_import_without_price_column(store, tmp_path):
+    path = tmp_path / "export.csv"
+    pd.DataFrame({'Beds': [3], 'Baths': [2]}).to_csv(path, index=False)
+    with pytest.raises(ValueError, match="No price column"):
+        import_comps(str(path), store)
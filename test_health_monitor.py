@@ -0,0 +1,77 @@
+import asyncio
+from types import SimpleNamespace
+
+from utils.health_monitor import HealthMonitor
+
+
+class FakeAsyncClient:
+    """Probes succeed unless the key is in `failing`"""
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.failing = set()
+
+    def api_keys_for(self, provider):
+        return self.keys.get(provider, [])
+
+    async def probe(self, provider, api_key, timeout=None):
+        if api_key in self.failing:
+            raise RuntimeError(f"{provider}: 400 API key not valid")
+
+
+class FakeAnalyzer:
+    def __init__(self, keys):
+        self.async_client = FakeAsyncClient(keys)
+        self.client = SimpleNamespace(
+            router=SimpleNamespace(providers=list(keys)),
+            async_client=self.async_client,
+            run=lambda coro, timeout=None: asyncio.run(coro),
+        )
+        self.availability = []
+
+    def set_provider_available(self, provider, available):
+        self.availability.append((provider, available))
+
+
+def test_probe_round_caches_results_and_marks_providers_down():
+    analyzer = FakeAnalyzer({"gemini": ["gemini-key-1", "gemini-key-2"], "openai": ["openai-key-1"]})
+    monitor = HealthMonitor(analyzer, failures_to_mark_down=2)
+
+    monitor.probe_all()
+    status = monitor.provider_status()
+    assert status["gemini"]["healthy_keys"] == 2 and status["openai"]["healthy_keys"] == 1
+    assert monitor.rounds == 1
+    assert sorted(analyzer.availability) == [("gemini", True), ("openai", True)]
+
+    # One bad gemini key: the provider stays up
+    analyzer.async_client.failing = {"gemini-key-1"}
+    analyzer.availability.clear()
+    monitor.probe_all()
+    failed = [result for result in monitor.snapshot() if not result['ok']]
+    assert [result['key'] for result in failed] == ["gemini-key..."]
+    assert "API key not valid" in failed[0]['error']
+    assert monitor.provider_status()["gemini"]["healthy_keys"] == 1
+    assert ("gemini", False) not in analyzer.availability
+
+    # Every openai key failing takes failures_to_mark_down rounds to mark it down
+    analyzer.async_client.failing = {"openai-key-1"}
+    analyzer.availability.clear()
+    monitor.probe_all()
+    assert ("openai", False) not in analyzer.availability
+    monitor.probe_all()
+    assert ("openai", False) in analyzer.availability
+    assert monitor.provider_status()["openai"]["healthy_keys"] == 0
+
+    # ...and one good round brings it back
+    analyzer.async_client.failing = set()
+    analyzer.availability.clear()
+    monitor.probe_all()
+    assert ("openai", True) in analyzer.availability
+    assert monitor.rounds == 5
+
+
+def test_no_client_means_no_probes():
+    analyzer = SimpleNamespace(client=None)
+    monitor = HealthMonitor(analyzer)
+    monitor.probe_all()
+    assert monitor.rounds == 0 and monitor.snapshot() == []
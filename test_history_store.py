@@ -0,0 +1,24 @@
+from utils.history_store import HistoryStore
+
+PROPERTY = {"address": "12 Oak Street", "purchase_price": 300000}
+COMPS = {"comparables": []}
+
+
+def test_failed_analyses_are_kept_but_never_served(tmp_path):
+    history = HistoryStore(db_file=str(tmp_path / "history.db"))
+    history.record("alice", PROPERTY, COMPS, "Rent is about $2,000.", {}, cache_key="k")
+    history.record("alice", PROPERTY, COMPS, "Rent is about \n\n❌ Stream interrupted", {}, cache_key="k", failed=True)
+    assert history.count("alice") == 2
+    assert history.lookup("k") == "Rent is about $2,000."
+    assert history.lookup("other") is None
+
+
+def test_pages_continue_after_the_cursor(tmp_path):
+    history = HistoryStore(db_file=str(tmp_path / "history.db"))
+    ids = [history.record("alice", dict(PROPERTY, purchase_price=i), COMPS, f"analysis {i}", {}) for i in range(5)]
+    history.record("bob", PROPERTY, COMPS, "not alice's", {})
+
+    first = history.page("alice", limit=3)
+    second = history.page("alice", limit=3, before=history.cursor(first[-1]))
+    assert [entry['id'] for entry in first + second] == ids[::-1]
+    assert history.get(ids[0], "bob") is None
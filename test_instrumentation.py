@@ -0,0 +1,52 @@
+import pytest
+
+from utils.instrumentation import Instrumentation, RingHistogram
+
+
+def test_ring_buffer_quantiles_cover_only_the_window():
+    histogram = RingHistogram(size=100)
+    for seconds in range(1, 201):
+        histogram.observe(float(seconds))
+    # Only 101..200 are still in the buffer; count and sum cover everything
+    assert histogram.quantiles() == {0.5: 151.0, 0.95: 196.0, 0.99: 200.0}
+    assert (histogram.count, histogram.total) == (200, 20100.0)
+    assert RingHistogram().quantiles() == {0.5: None, 0.95: None, 0.99: None}
+
+
+def test_span_counts_errors():
+    instruments = Instrumentation()
+    with instruments.span("lookup"):
+        pass
+    with pytest.raises(KeyError):
+        with instruments.span("lookup"):
+            raise KeyError("missing")
+
+    @instruments.timed("build")
+    def build():
+        return "prompt"
+
+    assert build() == "prompt"
+    rows = {row['stage']: row for row in instruments.snapshot()}
+    assert (rows['lookup']['count'], rows['lookup']['errors']) == (2, 1)
+    assert rows['build']['count'] == 1 and rows['build']['p50_ms'] is not None
+
+
+def test_prometheus_text_format(tmp_path):
+    instruments = Instrumentation(prom_file=str(tmp_path / "metrics.prom"))
+    instruments.observe("cache_get", 0.25)
+    instruments.observe("cache_get", 0.5, error=True)
+
+    text = instruments.render_prometheus()
+    assert text.endswith("\n")
+    lines = text.splitlines()
+    assert "# TYPE property_ai_stage_duration_seconds summary" in lines
+    assert 'property_ai_stage_duration_seconds{stage="cache_get",quantile="0.5"} 0.500000' in lines
+    assert 'property_ai_stage_duration_seconds_sum{stage="cache_get"} 0.750000' in lines
+    assert 'property_ai_stage_duration_seconds_count{stage="cache_get"} 2' in lines
+    assert "# TYPE property_ai_stage_errors_total counter" in lines
+    assert 'property_ai_stage_errors_total{stage="cache_get"} 1' in lines
+
+    path = instruments.export()
+    with open(path) as f:
+        assert f.read() == text
+    assert not list(tmp_path.glob(".metrics-*"))
@@ -0,0 +1,184 @@
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import utils.ai_client
+from stub_ai_server import STUB_ANALYSIS, StubAIHandler
+from utils.ai_helpers import PropertyAIAnalyzer
+from utils.analysis_cache import AnalysisCache
+from utils.job_queue import JobQueue, QueueFullError
+
+PROPERTY = {"address": "12 Oak Street", "bedrooms": 3, "bathrooms": 2, "square_feet": 1500,
+            "property_type": "Single Family", "year_built": 1990, "purchase_price": 300000, "condition": "Good"}
+COMPS = {"comparables": [{"price": 310000, "rent": 2100, "sqft": 1450}]}
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    """stub_ai_server.py on a free port, with the AI client pointed at it"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubAIHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(utils.ai_client, "GEMINI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1beta")
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_analyzer(tmp_path, monkeypatch, keys):
+    monkeypatch.setenv("GEMINI_API_KEYS", keys)
+    cache = AnalysisCache(db_file=str(tmp_path / "cache.db"))
+    return PropertyAIAnalyzer(cache=cache, background_setup=False, approximate_cache=False)
+
+
+def make_queue(tmp_path, analyzer, **kwargs):
+    completed = []
+    queue = JobQueue(analyzer, db_file=str(tmp_path / "jobs.db"), on_complete=completed.append, **kwargs)
+    return queue, completed
+
+
+def wait_for(queue, job_id, username="alice", timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id, username)
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} still {job['status']}")
+
+
+class ScriptedAnalyzer:
+    """Yields the given chunks, then reports `error` (if any) the way analyze_stream does"""
+
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+        self.nearby = []
+
+    def analyze_stream(self, property_data, comps_data, info=None, nearby=None):
+        self.nearby.append(nearby)
+        info['provider'] = 'gemini'
+        yield from self.chunks
+        if self.error:
+            info['error'] = self.error
+            yield "\n\n" + self.error
+
+
+def test_job_completes_against_stub_and_charges_once(tmp_path, monkeypatch, stub_server):
+    analyzer = make_analyzer(tmp_path, monkeypatch, "good-key")
+    assert analyzer.status == 'ready'
+    queue, completed = make_queue(tmp_path, analyzer)
+    queue.start()
+
+    job_id = queue.submit("alice", PROPERTY, COMPS)
+    job = wait_for(queue, job_id)
+    assert job['status'] == 'done'
+    assert job['analysis'] == STUB_ANALYSIS
+    assert job['provider'] == 'gemini'
+    assert [done['id'] for done in completed] == [job_id]
+    assert completed[0]['status'] == 'done'
+    assert queue.get(job_id, "mallory") is None
+    assert queue.active_job_id("alice") is None
+
+    # The same request again is served from the cache, and charged as its own job
+    second = wait_for(queue, queue.submit("alice", PROPERTY, COMPS))
+    assert second['provider'] == 'cache' and len(completed) == 2
+
+
+def test_unavailable_provider_fails_without_charging(tmp_path, monkeypatch, stub_server):
+    analyzer = make_analyzer(tmp_path, monkeypatch, "bad-key")
+    assert analyzer.status == 'unavailable'
+    queue, completed = make_queue(tmp_path, analyzer)
+    queue.start()
+
+    job = wait_for(queue, queue.submit("alice", PROPERTY, COMPS))
+    assert job['status'] == 'failed' and job['error']
+    assert completed == []
+
+
+def test_partial_stream_error_fails_the_job(tmp_path):
+    queue, completed = make_queue(tmp_path, ScriptedAnalyzer(["Rent is about "], error="❌ Stream interrupted"))
+    queue.submit("alice", PROPERTY, COMPS)
+    job = queue._claim()
+    queue._run(job)
+
+    stored = queue.get(job['id'], "alice")
+    assert stored['status'] == 'failed'
+    assert stored['error'] == "❌ Stream interrupted"
+    assert completed == []
+
+
+def test_finish_charges_exactly_once(tmp_path):
+    queue, completed = make_queue(tmp_path, ScriptedAnalyzer(["analysis"]))
+    queue.submit("alice", PROPERTY, COMPS)
+    job = queue._claim()
+    queue._run(job)
+    queue._finish(job, 'done')
+    queue._finish(job, 'failed', error="late")
+    assert len(completed) == 1
+    assert queue.get(job['id'], "alice")['status'] == 'done'
+
+
+def test_nearby_listings_reach_the_analyzer_outside_the_inputs(tmp_path):
+    analyzer = ScriptedAnalyzer(["analysis"])
+    queue, _ = make_queue(tmp_path, analyzer)
+    nearby = [{"price": 305000, "rent": 2050, "sqft": 1480}]
+    job_id = queue.submit("alice", PROPERTY, COMPS, nearby=nearby)
+    queue._run(queue._claim())
+    assert analyzer.nearby == [nearby]
+    job = queue.get(job_id, "alice")
+    assert job['nearby'] == nearby and job['comps_data'] == COMPS
+
+
+def test_queue_limit(tmp_path):
+    queue, _ = make_queue(tmp_path, ScriptedAnalyzer([]), max_pending=2)
+    queue.submit("alice", PROPERTY, COMPS)
+    queue.submit("bob", PROPERTY, COMPS)
+    with pytest.raises(QueueFullError):
+        queue.submit("carol", PROPERTY, COMPS)
+    assert queue.get_stats()['queued'] == 2
+
+
+def test_live_jobs_are_not_requeued_by_another_process(tmp_path):
+    queue, _ = make_queue(tmp_path, ScriptedAnalyzer(["analysis"]))
+    job_id = queue.submit("alice", PROPERTY, COMPS)
+    job = queue._claim()
+
+    other, _ = make_queue(tmp_path, ScriptedAnalyzer(["analysis"]))
+    assert other._claim() is None
+    assert queue.get(job_id, "alice")['status'] == 'running'
+    assert job['attempts'] == 1
+
+
+def test_expired_lease_is_requeued_and_stale_worker_cannot_finish(tmp_path):
+    queue, stale_completed = make_queue(tmp_path, ScriptedAnalyzer(["stale"]))
+    job_id = queue.submit("alice", PROPERTY, COMPS)
+    stale = queue._claim()
+    with queue._connection() as conn:
+        conn.execute("UPDATE jobs SET heartbeat_at = ?", (time.time() - JobQueue.LEASE_SECONDS - 1,))
+
+    other, completed = make_queue(tmp_path, ScriptedAnalyzer(["fresh"]))
+    retry = other._claim()
+    assert retry['id'] == job_id and retry['attempts'] == 2
+
+    queue._run(stale)
+    assert stale_completed == []
+    assert queue.get(job_id, "alice")['status'] == 'running'
+
+    other._run(retry)
+    assert [job['analysis'] for job in completed] == ["fresh"]
+
+
+def test_gives_up_after_max_attempts(tmp_path):
+    queue, completed = make_queue(tmp_path, ScriptedAnalyzer(["analysis"]), max_attempts=1)
+    job_id = queue.submit("alice", PROPERTY, COMPS)
+    queue._claim()
+    with queue._connection() as conn:
+        conn.execute("UPDATE jobs SET heartbeat_at = 0")
+    queue.start()
+    job = wait_for(queue, job_id)
+    assert job['status'] == 'failed' and "Gave up" in job['error']
+    assert completed == []
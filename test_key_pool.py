@@ -0,0 +1,101 @@
+import asyncio
+
+import httpx
+import pytest
+
+from utils.ai_client import AIClientError, AsyncAIClient
+from utils.key_pool import APIKeyPool, NoKeyAvailableError, TokenBucket
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(rate_per_minute=60, burst=2)
+    now = bucket.updated
+    assert bucket.take(now) and bucket.take(now)
+    assert not bucket.take(now)
+    assert bucket.seconds_until_token(now) == pytest.approx(1.0)
+    assert bucket.take(now + 1.0)
+
+
+def test_reserve_spreads_over_keys():
+    pool = APIKeyPool(["key-a", "key-b"], rate_per_minute=60, burst=1)
+    first, _ = pool.reserve()
+    second, _ = pool.reserve()
+    assert {first, second} == {"key-a", "key-b"}
+    key, wait = pool.reserve()
+    assert key is None and wait > 0
+
+
+def test_quota_errors_back_off_exponentially():
+    pool = APIKeyPool(["key-a", "key-b"], quota_cooldown=60, max_quota_cooldown=200)
+    state = pool._states["key-a"]
+
+    pool.report_failure("key-a", "429 quota exceeded", status_code=429)
+    first_cooldown = state.cooldown_until
+    pool.report_failure("key-a", "resource exhausted")
+    assert state.cooldown_until - first_cooldown == pytest.approx(60, abs=1)
+    # 240s, capped at max_quota_cooldown
+    pool.report_failure("key-a", "quota", status_code=429)
+    assert 190 < pool.get_stats()[0]["cooldown_seconds"] <= 200
+    assert pool.healthy_count() == 1
+
+    # Only key-b is handed out while key-a cools down
+    assert {pool.reserve()[0] for _ in range(3)} == {"key-b"}
+
+    pool.report_success("key-a")
+    assert state.consecutive_quota_errors == 0
+
+
+def test_invalid_keys_are_parked_and_other_errors_are_not():
+    pool = APIKeyPool(["key-a"], invalid_key_cooldown=3600)
+    pool.report_failure("key-a", "503 unavailable", status_code=503)
+    assert pool.healthy_count() == 1
+    assert not pool.is_retryable(503, "unavailable")
+
+    pool.report_failure("key-a", "API key not valid", status_code=401)
+    assert pool.healthy_count() == 0
+    assert pool.is_retryable(401, "API key not valid")
+    with pytest.raises(NoKeyAvailableError):
+        pool.acquire(max_wait=0.1)
+    with pytest.raises(NoKeyAvailableError):
+        asyncio.run(pool.acquire_async(max_wait=0.1))
+
+
+def test_gemini_bad_key_400_is_an_invalid_key():
+    # What Gemini returns for a mistyped or revoked key
+    response = httpx.Response(400, json={"error": {
+        "code": 400,
+        "message": "API key not valid. Please pass a valid API key.",
+        "status": "INVALID_ARGUMENT",
+        "details": [{
+            "@type": "type.googleapis.com/google.rpc.ErrorInfo",
+            "reason": "API_KEY_INVALID",
+            "domain": "googleapis.com",
+            "metadata": {"service": "generativelanguage.googleapis.com"},
+        }],
+    }})
+    with pytest.raises(AIClientError) as caught:
+        AsyncAIClient._raise_for_status("gemini", response)
+    error = caught.value
+
+    pool = APIKeyPool(["key-a", "key-b"], invalid_key_cooldown=3600)
+    pool.acquire()
+    pool.report_failure("key-a", error, error.status_code)
+    assert pool.is_retryable(error.status_code, error)
+    assert pool.get_stats()[0]["cooldown_seconds"] > 3000
+    assert pool.healthy_count() == 1
+
+    # Other bad requests are the prompt's fault, not the key's
+    assert not pool.is_retryable(400, "gemini: 400 Invalid JSON payload received")
+    assert pool.is_retryable(400, "gemini: 400 API_KEY_INVALID")
+
+
+def test_in_flight_is_released():
+    pool = APIKeyPool(["key-a"], rate_per_minute=600, burst=10)
+    keys = [pool.acquire() for _ in range(3)]
+    assert pool.get_stats()[0]["in_flight"] == 3
+    pool.report_success(keys[0])
+    pool.report_failure(keys[1], "boom")
+    pool.release(keys[2])
+    stats = pool.get_stats()[0]
+    assert stats["in_flight"] == 0
+    assert (stats["requests"], stats["successes"], stats["failures"]) == (3, 1, 1)
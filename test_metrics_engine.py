@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.metrics_engine import (
+    METRIC_COLUMNS, binned_scatter, compare_to_market, compute_portfolio_metrics, compute_property_metrics,
+    histogram,
+)
+
+PROPERTY = {"address": "12 Oak Street", "square_feet": 1500, "purchase_price": 300000, "bedrooms": 3,
+            "bathrooms": 2, "year_built": 1990, "property_type": "Single Family", "condition": "Good"}
+COMPS = {"comparables": [
+    {"price": 310000, "rent": 2100, "sqft": 1500},
+    {"price": 290000, "rent": 1900, "sqft": 1400},
+    {"price": 0, "rent": 0, "sqft": 1600},
+]}
+
+
+def test_property_metrics():
+    metrics = compute_property_metrics(PROPERTY, COMPS)
+    rent_per_sqft = (2100 / 1500 + 1900 / 1400) / 2
+    assert metrics['comp_rent_per_sqft'] == pytest.approx(rent_per_sqft)
+    assert metrics['implied_rent'] == pytest.approx(1500 * rent_per_sqft)
+    assert metrics['gross_yield'] == pytest.approx(1500 * rent_per_sqft * 12 / 300000 * 100)
+    assert metrics['price_per_sqft'] == 200
+
+
+def test_property_metrics_without_inputs():
+    metrics = compute_property_metrics({"square_feet": 0, "purchase_price": 0}, {"comparables": []})
+    assert set(metrics) == set(METRIC_COLUMNS)
+    assert all(value is None for value in metrics.values())
+
+
+def test_portfolio_metrics_match_single_property():
+    properties = pd.DataFrame([
+        {"property_id": "a", "square_feet": 1500, "purchase_price": 300000},
+        {"property_id": "b", "square_feet": 0, "purchase_price": 200000},
+    ])
+    comps = pd.DataFrame([{"property_id": "a", **comp} for comp in COMPS["comparables"]]
+                         + [{"property_id": "b", "price": 210000, "rent": 1500, "sqft": 1000},
+                            {"property_id": "orphan", "price": 1, "rent": 1, "sqft": 1}])
+    result = compute_portfolio_metrics(properties, comps)
+    single = compute_property_metrics(PROPERTY, COMPS)
+    for column in METRIC_COLUMNS:
+        assert result.loc[0, column] == pytest.approx(single[column])
+    # No sqft: rent falls back to the comps' average rent
+    assert result.loc[1, 'implied_rent'] == 1500
+
+
+def test_compare_to_market():
+    comparison = compare_to_market([100, 200, 300, 0], [1, 2, 3, 0], [1, 1, 1, 1], 250, 1)
+    summary = comparison['summary']['price_per_sqft']
+    assert summary['count'] == 3 and summary['mean'] == 200 and summary['p50'] == 200
+    assert comparison['subject']['percentile'] == pytest.approx(200 / 3)
+    assert comparison['subject']['vs_median_pct'] == pytest.approx(25)
+    assert np.isnan(comparison['comps']['price'][3])
+
+    empty = compare_to_market([], [], [], 250, 0)
+    assert empty['summary']['rent']['count'] == 0
+    assert empty['subject']['price_per_sqft'] is None
+
+
+def test_histogram_and_binned_scatter():
+    values = np.concatenate([np.arange(100.0), [np.nan, 1e9]])
+    centers, counts = histogram(values, bins=10)
+    assert counts.sum() == 101 and len(centers) == 10
+
+    x = np.random.default_rng(0).uniform(0, 1, 100_000)
+    mean_x, mean_y, cell_counts = binned_scatter(x, 2 * x, bins=20)
+    assert len(cell_counts) <= 400 and cell_counts.sum() == 100_000
+    assert mean_y == pytest.approx(2 * mean_x)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from utils.monte_carlo import irr, npv, simulate_portfolio, simulate_property
+
+PROPERTY = {"address": "12 Oak Street", "square_feet": 1500, "purchase_price": 300000, "bedrooms": 3,
+            "bathrooms": 2, "year_built": 1990, "property_type": "Single Family", "condition": "Good"}
+COMPS = {"comparables": [
+    {"price": 310000, "rent": 2100, "sqft": 1500},
+    {"price": 290000, "rent": 1900, "sqft": 1400},
+    {"price": 0, "rent": 0, "sqft": 1600},
+]}
+
+
+def test_irr_and_npv():
+    flows = [[-100, 110, 0], [-100, 0, 121], [100, 10, 10]]
+    rates = irr(flows)
+    assert rates[0] == pytest.approx(0.10) and rates[1] == pytest.approx(0.10)
+    # All inflows: no IRR
+    assert np.isnan(rates[2])
+    assert npv([[-100, 110]], 0.10)[0] == pytest.approx(0.0)
+
+
+def test_simulation_is_reproducible_and_sane():
+    first = simulate_property(PROPERTY, COMPS, n_paths=2000, years=10, seed=42, keep_paths=True)
+    second = simulate_property(PROPERTY, COMPS, n_paths=2000, years=10, seed=42)
+    assert first['irr'] == second['irr']
+    assert first['cash_flows'].shape == (2000, 11)
+    assert first['irr']['p5'] <= first['irr']['p50'] <= first['irr']['p95']
+    total_return = first['cash_flows'].sum(axis=1)
+    assert first['loss_probability'] == pytest.approx(float(np.mean(total_return < 0)))
+    assert first['npv']['mean'] == pytest.approx(float(np.mean(first['npv_paths'])))
+
+    with pytest.raises(ValueError):
+        simulate_property(dict(PROPERTY, purchase_price=0), COMPS, n_paths=10, years=5)
+
+
+def test_paths_that_never_pay_back_count_as_total_losses():
+    # No net rent and nothing left after selling: every path only pays out
+    assumptions = {'expense_ratio': 1.0, 'selling_cost_pct': 1.0}
+    result = simulate_property(PROPERTY, COMPS, n_paths=500, years=5, seed=1, assumptions=assumptions)
+    assert result['irr']['p95'] == pytest.approx(-100)
+    assert result['irr_undefined'] == 0
+    assert result['loss_probability'] == 1.0
+
+
+def test_portfolio_simulation_is_independent_of_process_count():
+    items = [(PROPERTY, COMPS), (dict(PROPERTY, purchase_price=250000), COMPS)]
+    serial = simulate_portfolio(items, n_paths=500, years=5, seed=7, processes=1)
+    parallel = simulate_portfolio(items, n_paths=500, years=5, seed=7, processes=2)
+    assert [result['irr'] for result in serial] == [result['irr'] for result in parallel]
+    assert serial[0]['irr'] != serial[1]['irr']
@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+
+from utils.provider_router import CircuitBreaker, ProviderRouter
+
+
+class FakeClient:
+    """Stands in for AsyncAIClient: per-provider delay and failure, records every call"""
+
+    def __init__(self, delays=None, failing=(), failing_mid_stream=()):
+        self.api_keys = {"gemini": "key", "openai": "key"}
+        self.key_pools = {}
+        self.delays = delays or {}
+        self.failing = set(failing)
+        self.failing_mid_stream = set(failing_mid_stream)
+        self.calls = []
+
+    async def generate(self, provider, prompt, generation_config=None):
+        self.calls.append(provider)
+        await asyncio.sleep(self.delays.get(provider, 0))
+        if provider in self.failing:
+            raise RuntimeError(f"{provider}: 503 unavailable")
+        return f"{provider} says hi"
+
+    async def stream(self, provider, prompt, generation_config=None):
+        self.calls.append(provider)
+        await asyncio.sleep(self.delays.get(provider, 0))
+        if provider in self.failing:
+            raise RuntimeError(f"{provider}: 503 unavailable")
+        for word in ("hello", " from ", provider):
+            yield word
+            if provider in self.failing_mid_stream:
+                raise RuntimeError(f"{provider}: stream reset")
+
+
+def collect(router, prompt="p"):
+    async def run():
+        return [item async for item in router.stream(prompt)]
+    return asyncio.run(run())
+
+
+def test_breaker_opens_after_consecutive_failures_and_recovers():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.05)
+    for _ in range(3):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow_request()
+
+    asyncio.run(asyncio.sleep(0.06))
+    assert breaker.allow_request() and breaker.state == "half_open"
+    breaker.on_request()
+    # Only one trial at a time
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_breaker_failed_trial_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow_request() and breaker.state == "half_open"
+    breaker.on_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_breaker_opens_on_windowed_error_rate():
+    breaker = CircuitBreaker(failure_threshold=5, error_rate_threshold=0.5, min_window_requests=10)
+    for i in range(9):
+        (breaker.record_failure if i % 2 else breaker.record_success)()
+    # Never two failures in a row, and too few requests for the rate yet
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.error_rate() == pytest.approx(0.5)
+
+
+def test_breaker_ignores_old_outcomes():
+    breaker = CircuitBreaker(window_seconds=0.05, min_window_requests=4)
+    for _ in range(3):
+        breaker.record_failure()
+    asyncio.run(asyncio.sleep(0.06))
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    assert breaker.error_rate() == 1.0
+
+
+def test_generate_uses_primary_when_fast():
+    client = FakeClient()
+    router = ProviderRouter(client)
+    assert asyncio.run(router.generate("p")) == ("gemini", "gemini says hi")
+    assert client.calls == ["gemini"]
+
+
+def test_generate_fails_over_and_breaker_skips_provider():
+    client = FakeClient(failing={"gemini"})
+    router = ProviderRouter(client, failure_threshold=2)
+    for _ in range(2):
+        assert asyncio.run(router.generate("p")) == ("openai", "openai says hi")
+    assert router.stats["failovers"] == 2
+    assert router.breakers["gemini"].state == "open"
+    assert router.candidates() == ["openai"]
+
+    client.calls.clear()
+    asyncio.run(router.generate("p"))
+    assert client.calls == ["openai"]
+
+
+def test_generate_hedges_slow_primary():
+    client = FakeClient(delays={"gemini": 0.5})
+    router = ProviderRouter(client, default_hedge_delay=0.05)
+    assert asyncio.run(router.generate("p")) == ("openai", "openai says hi")
+    assert router.stats["hedged"] == 1 and router.stats["hedge_wins"] == 1
+    # The losing request was cancelled, which doesn't count against gemini
+    assert router.breakers["gemini"].consecutive_failures == 0
+
+
+def test_stream_fails_over_before_first_chunk():
+    client = FakeClient(failing={"gemini"})
+    router = ProviderRouter(client)
+    chunks = collect(router)
+    assert "".join(text for _, text in chunks) == "hello from openai"
+    assert {provider for provider, _ in chunks} == {"openai"}
+
+
+def test_stream_failing_after_first_chunk_counts_once_as_a_failure():
+    client = FakeClient(failing_mid_stream={"gemini"})
+    router = ProviderRouter(client, failure_threshold=2)
+    with pytest.raises(RuntimeError, match="stream reset"):
+        collect(router)
+    breaker = router.breakers["gemini"]
+    assert breaker.consecutive_failures == 1 and breaker.error_rate() == 1.0
+    # The first token still gave a latency sample
+    assert router.first_token["gemini"].count() == 1
+
+    with pytest.raises(RuntimeError):
+        collect(router)
+    assert breaker.state == "open"
+
+
+def test_stream_success_is_recorded_at_the_end():
+    client = FakeClient()
+    router = ProviderRouter(client)
+    router.breakers["gemini"].record_failure()
+    assert "".join(text for _, text in collect(router)) == "hello from gemini"
+    assert router.breakers["gemini"].consecutive_failures == 0
+    assert router.latency["gemini"].count() == 1
+
+
+def test_no_providers_available():
+    client = FakeClient()
+    router = ProviderRouter(client, providers=("gemini",))
+    router.breakers["gemini"].trip()
+    with pytest.raises(RuntimeError, match="No AI providers"):
+        asyncio.run(router.generate("p"))
@@ -0,0 +1,32 @@
+import pytest
+
+from utils.sensitivity import GRID_AXES, compute_sensitivity_grid, grid_slice, summarize_grid
+
+
+def test_sensitivity_grid_matches_scalar_formula():
+    grid = compute_sensitivity_grid(
+        300000, 2000, price_changes=[-0.1, 0, 0.1], rent_changes=[0, 0.05], interest_rates=[0.0, 0.06],
+        down_payments=[0.2, 0.25], loan_years=30, expense_ratio=0.35, closing_cost_pct=0.03,
+    )
+    assert grid['cash_on_cash'].shape == (3, 2, 2, 2)
+
+    price, rent, rate, down = 300000 * 1.1, 2000 * 1.05, 0.06, 0.25
+    monthly_rate = rate / 12
+    payment = price * (1 - down) * monthly_rate / (1 - (1 + monthly_rate) ** -360)
+    cash_flow = rent * 0.65 - payment
+    assert grid['monthly_cash_flow'][2, 1, 1, 1] == pytest.approx(cash_flow, rel=1e-5)
+    assert grid['cash_on_cash'][2, 1, 1, 1] == pytest.approx(cash_flow * 12 / (price * 0.28) * 100, rel=1e-5)
+    assert grid['gross_yield'][1, 0, 0, 0] == pytest.approx(8.0)
+    # A zero rate is a plain 30-year split of the loan
+    assert grid['monthly_cash_flow'][1, 0, 0, 0] == pytest.approx(2000 * 0.65 - 240000 / 360, rel=1e-5)
+
+
+def test_grid_slice_and_summary():
+    grid = compute_sensitivity_grid(300000, 2000, [-0.1, 0, 0.1], [0, 0.05], [0.05, 0.06, 0.07], [0.2])
+    view = grid_slice(grid, 'monthly_cash_flow', 'interest_rate', 'price_change', {'rent_change': 1, 'down_payment': 0})
+    assert view.shape == (3, 3)
+    assert view[2, 0] == grid['monthly_cash_flow'][0, 1, 2, 0]
+    summary = summarize_grid(grid)
+    assert summary['cells'] == 18
+    assert summary['best_cash_flow'] == pytest.approx(float(grid['monthly_cash_flow'].max()))
+    assert len(GRID_AXES) == 4
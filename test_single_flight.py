@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+
+def run_concurrently(count, target):
+    results = [None] * count
+    errors = [None] * count
+
+    def worker(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results, errors
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return "analysis"
+
+    results, errors = run_concurrently(5, lambda: flight.do("key", slow))
+    assert results == ["analysis"] * 5 and errors == [None] * 5
+    assert len(calls) == 1
+    assert flight.get_stats()["coalesced"] == 4
+    assert flight.get_stats()["in_flight"] == 0
+
+
+def test_errors_are_shared_and_not_remembered():
+    flight = SingleFlight()
+
+    def failing():
+        time.sleep(0.1)
+        raise ValueError("provider down")
+
+    _, errors = run_concurrently(3, lambda: flight.do("key", failing))
+    assert all(isinstance(error, ValueError) for error in errors)
+    # The next call runs again instead of reusing the failure
+    assert flight.do("key", lambda: "ok") == "ok"
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.get_stats()["executions"] == 2
+
+
+def test_stream_replays_to_late_joiners():
+    flight = SingleFlight()
+    started = threading.Event()
+    produced = []
+
+    def chunks():
+        for chunk in ("a", "b", "c"):
+            produced.append(chunk)
+            started.set()
+            time.sleep(0.05)
+            yield chunk
+
+    first = flight.stream("key", chunks)
+    assert next(first) == "a"
+    started.wait()
+    second = flight.stream("key", chunks)
+    assert list(second) == ["a", "b", "c"]
+    assert list(first) == ["b", "c"]
+    assert produced == ["a", "b", "c"]
+    assert flight.get_stats()["stream_coalesced"] == 1
+
+
+def test_stream_finishes_after_readers_leave():
+    flight = SingleFlight()
+    finished = threading.Event()
+
+    def chunks():
+        yield "a"
+        time.sleep(0.05)
+        yield "b"
+        finished.set()
+
+    stream = flight.stream("key", chunks)
+    assert next(stream) == "a"
+    stream.close()
+    assert finished.wait(2)
+
+
+def test_stream_error_reaches_readers():
+    flight = SingleFlight()
+
+    def chunks():
+        yield "partial"
+        raise RuntimeError("stream failed")
+
+    stream = flight.stream("key", chunks)
+    assert next(stream) == "partial"
+    with pytest.raises(RuntimeError, match="stream failed"):
+        next(stream)
@@ -0,0 +1,153 @@
+import json
+import threading
+
+import pytest
+
+from utils.user_store import JSONUserStore, SQLiteUserStore, USER_FIELDS, UserMapping, UserStore
+
+
+def record(**fields):
+    user = {
+        'password': 'hash', 'email': 'a@example.com', 'plan': 'free', 'created_at': '2024-01-01T00:00:00',
+        'usage_count': 0, 'max_uses': 5, 'last_reset': '2024-01-01T00:00:00',
+    }
+    user.update(fields)
+    return user
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'json':
+        return JSONUserStore(str(tmp_path / 'users.json'))
+    return SQLiteUserStore(str(tmp_path / 'users.db'))
+
+
+def test_interface_is_abstract():
+    with pytest.raises(TypeError):
+        UserStore()
+
+
+def test_create_get_update(store):
+    assert store.create('alice', record())
+    assert not store.create('alice', record(email='other@example.com'))
+    assert store.get('alice') == record()
+    assert store.get('bob') is None
+
+    assert store.update('alice', plan='premium', max_uses=float('inf'))
+    assert store.get('alice')['max_uses'] == float('inf')
+    assert not store.update('bob', plan='premium')
+    assert store.usernames() == ['alice'] and store.count() == 1
+
+
+def test_get_returns_a_copy(store):
+    store.create('alice', record())
+    store.get('alice')['usage_count'] = 99
+    assert store.get('alice')['usage_count'] == 0
+
+
+def test_concurrent_increments_are_not_lost(store):
+    store.create('alice', record())
+
+    def increment():
+        for _ in range(20):
+            store.increment_usage('alice')
+
+    threads = [threading.Thread(target=increment) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.get('alice')['usage_count'] == 80
+
+
+def test_json_store_sees_other_writers(tmp_path):
+    path = str(tmp_path / 'users.json')
+    first, second = JSONUserStore(path), JSONUserStore(path)
+    first.create('alice', record())
+    assert second.get('alice') is not None
+    second.increment_usage('alice')
+    assert first.get('alice')['usage_count'] == 1
+
+
+def test_json_store_writes_atomically(tmp_path):
+    path = tmp_path / 'users.json'
+    store = JSONUserStore(str(path))
+    store.create('alice', record())
+    # No temp files are left behind and the file is always complete JSON
+    assert json.loads(path.read_text()) == {'alice': record()}
+    assert not list(tmp_path.glob('.users-*'))
+
+
+def test_sqlite_rejects_unknown_fields(tmp_path):
+    store = SQLiteUserStore(str(tmp_path / 'users.db'))
+    store.create('alice', record())
+    with pytest.raises(ValueError):
+        store.update('alice', is_admin=True)
+
+
+def test_migration_from_json(tmp_path):
+    legacy = tmp_path / 'users.json'
+    legacy.write_text(json.dumps({'alice': record(usage_count=3), 'bob': record(plan='premium')}))
+    store = SQLiteUserStore(str(tmp_path / 'users.db'), migrate_from=str(legacy))
+
+    assert store.get('alice') == record(usage_count=3)
+    assert store.get('bob')['plan'] == 'premium'
+
+    # The file is set aside, so a restart doesn't import it again
+    assert not legacy.exists()
+    assert (tmp_path / 'users.json.migrated').exists()
+    assert store.migrate_from_json(str(legacy)) == 0
+
+
+def test_migration_keeps_existing_sqlite_users(tmp_path):
+    store = SQLiteUserStore(str(tmp_path / 'users.db'))
+    store.create('alice', record(usage_count=4))
+    legacy = tmp_path / 'users.json'
+    legacy.write_text(json.dumps({'alice': record(usage_count=0)}))
+    assert store.migrate_from_json(str(legacy)) == 1
+    assert store.get('alice')['usage_count'] == 4
+
+
+def test_migration_fills_missing_fields(tmp_path):
+    legacy = tmp_path / 'users.json'
+    legacy.write_text(json.dumps({
+        # Older files lack fields that are NOT NULL in SQLite
+        'bob': {'password': 'hash', 'plan': 'premium'},
+        'carol': {'email': 'no-password@example.com'},
+    }))
+    store = SQLiteUserStore(str(tmp_path / 'users.db'), migrate_from=str(legacy))
+
+    bob = store.get('bob')
+    assert set(bob) == set(USER_FIELDS)
+    assert (bob['email'], bob['usage_count'], bob['max_uses']) == ('', 0, float('inf'))
+    assert bob['last_reset'] == bob['created_at']
+    # A user without a password couldn't log in, so it isn't migrated
+    assert store.get('carol') is None
+
+
+def test_concurrent_migrations_import_once(tmp_path):
+    legacy = tmp_path / 'users.json'
+    legacy.write_text(json.dumps({f'user{i}': record() for i in range(50)}))
+    stores = [SQLiteUserStore(str(tmp_path / 'users.db')) for _ in range(4)]
+    counts = []
+    threads = [
+        threading.Thread(target=lambda store=store: counts.append(store.migrate_from_json(str(legacy))))
+        for store in stores
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(counts) == [0, 0, 0, 50]
+    assert stores[0].count() == 50
+
+
+def test_user_mapping(store):
+    store.create('alice', record())
+    users = UserMapping(store)
+    assert 'alice' in users and 'bob' not in users
+    assert users['alice']['email'] == 'a@example.com'
+    assert users.get('bob', 'missing') == 'missing'
+    assert list(users) == ['alice'] and len(users) == 1
+    with pytest.raises(KeyError):
+        users['bob']
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from utils.comps_store import CompsStore
+from utils.valuation_model import ValuationModel
+
+PROPERTY = {"address": "12 Oak Street", "square_feet": 1500, "purchase_price": 300000, "bedrooms": 3,
+            "bathrooms": 2, "year_built": 1990, "property_type": "Single Family", "condition": "Good"}
+
+
+@pytest.fixture
+def valuation_store(tmp_path):
+    rng = np.random.default_rng(3)
+    n = 400
+    sqft = rng.uniform(800, 3000, n)
+    store = CompsStore(str(tmp_path / "comps"))
+    store.append_columns({
+        'sqft': sqft,
+        'rent': 1.2 * sqft * np.exp(rng.normal(0, 0.05, n)),
+        'price': 200 * sqft * np.exp(rng.normal(0, 0.05, n)),
+        'bedrooms': np.round(sqft / 600),
+        'bathrooms': np.round(sqft / 900),
+        'year_built': rng.integers(1950, 2020, n).astype(float),
+        'property_type': np.zeros(n),
+    })
+    return store
+
+
+def test_valuation_model_recovers_the_trend(valuation_store):
+    model = ValuationModel(valuation_store)
+    assert model.ready
+    prediction = model.predict(PROPERTY)
+    assert prediction['rent'] == pytest.approx(1800, rel=0.1)
+    assert prediction['price'] == pytest.approx(300000, rel=0.1)
+    low, high = prediction['rent_range']
+    assert low < prediction['rent'] < high
+    assert prediction['rent_rows'] == 400
+
+
+def test_valuation_model_needs_enough_rows(tmp_path):
+    store = CompsStore(str(tmp_path / "comps"))
+    store.append_records([{'price': 300000, 'rent': 2000, 'sqft': 1500}])
+    model = ValuationModel(store)
+    assert not model.ready
+    assert model.predict(PROPERTY)['rent'] is None
@@ -0,0 +1,317 @@
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from utils.instrumentation import timed
+
+
+def _normalize(value):
+    """Normalize a value so equal inputs always serialize the same way"""
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, float) and value.is_integer():
+        # 2.0 and 2 should hash the same (number_input returns either)
+        return int(value)
+    return value
+
+
+def make_cache_key(property_data, comps_data, prompt_version, generation_config):
+    """Build a content-addressed key for one analysis request"""
+    payload = {
+        "property": _normalize(property_data or {}),
+        "comps": _normalize((comps_data or {}).get("comparables", [])),
+        "prompt_version": prompt_version,
+        "generation_config": _normalize(generation_config or {}),
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+# Bucket width per field for approximate keys (None compares the field exactly)
+DEFAULT_TOLERANCES = {
+    "purchase_price": 5000,
+    "square_feet": 50,
+    "bedrooms": None,
+    "bathrooms": 0.5,
+    "year_built": 5,
+    "comp_price": 5000,
+    "comp_rent": 50,
+    "comp_sqft": 50,
+}
+
+# Street suffixes spelled out or abbreviated the same way after normalization
+ADDRESS_ABBREVIATIONS = {
+    "street": "st", "avenue": "ave", "road": "rd", "drive": "dr", "boulevard": "blvd",
+    "lane": "ln", "court": "ct", "place": "pl", "terrace": "ter", "circle": "cir",
+    "highway": "hwy", "parkway": "pkwy", "apartment": "apt", "suite": "ste",
+    "north": "n", "south": "s", "east": "e", "west": "w",
+}
+
+
+def normalize_address(address):
+    """Lowercase, drop punctuation and abbreviate common words so spelling variants match"""
+    words = re.sub(r"[^\w\s]", " ", str(address or "").lower()).split()
+    return " ".join(ADDRESS_ABBREVIATIONS.get(word, word) for word in words)
+
+
+def _quantize(value, step):
+    """Bucket index of value for a bucket width of step (the value itself when step is None)"""
+    if step is None or not isinstance(value, (int, float)):
+        return _normalize(value)
+    return int(round(value / step))
+
+
+def _quantize_comps(comps, tolerances):
+    """Quantized comps in a fixed order, so reordering the same comps gives the same key"""
+    quantized = [
+        [
+            _quantize(comp.get("price") or 0, tolerances.get("comp_price")),
+            _quantize(comp.get("rent") or 0, tolerances.get("comp_rent")),
+            _quantize(comp.get("sqft") or 0, tolerances.get("comp_sqft")),
+        ]
+        for comp in comps
+    ]
+    return sorted(quantized)
+
+
+def make_approximate_key(property_data, comps_data, prompt_version, generation_config, tolerances=None):
+    """Key shared by requests that differ only within the given tolerances.
+
+    Fields in tolerances are bucketed, the address is normalized, comps are
+    sorted, and every other property field is compared exactly.
+    """
+    tolerances = dict(DEFAULT_TOLERANCES, **(tolerances or {}))
+    property_data = property_data or {}
+    comps_data = comps_data or {}
+    payload = {
+        "property": {
+            str(field): _quantize(value, tolerances.get(field))
+            for field, value in property_data.items() if field != "address"
+        },
+        "address": normalize_address(property_data.get("address")),
+        "comps": _quantize_comps(comps_data.get("comparables", []), tolerances),
+        "prompt_version": prompt_version,
+        "generation_config": _normalize(generation_config or {}),
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return "approx:" + hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class AnalysisCache:
+    """Two-tier (memory LRU + SQLite) cache for AI analyses.
+
+    An optional fallback(key) -> value (e.g. the analysis history) is asked
+    on a miss, and what it returns is copied into both tiers. Entries can
+    also be stored under an approximate key (see make_approximate_key),
+    which lookup() tries when the exact key misses.
+    """
+
+    def __init__(self, db_file='data/analysis_cache.db', max_memory_entries=256,
+                 max_disk_entries=5000, ttl_seconds=7 * 24 * 3600, fallback=None):
+        # Use absolute path for Streamlit Cloud
+        self.db_file = os.path.join(os.path.dirname(__file__), '..', db_file)
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self.fallback = fallback
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'fallback_hits': 0,
+            'approximate_hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'evictions': 0,
+        }
+        self.disk_enabled = self._setup_disk()
+
+    def _setup_disk(self):
+        """Create the on-disk tier, falling back to memory-only on error"""
+        try:
+            os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS analyses ("
+                    " key TEXT PRIMARY KEY,"
+                    " value TEXT NOT NULL,"
+                    " created_at REAL NOT NULL,"
+                    " accessed_at REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_analyses_accessed"
+                    " ON analyses (accessed_at)"
+                )
+            return True
+        except Exception as e:
+            print(f"❌ Analysis cache disk tier disabled: {e}")
+            return False
+
+    def _connect(self):
+        return sqlite3.connect(self.db_file, timeout=5)
+
+    def _is_expired(self, created_at, now):
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        return self.lookup(key)[0]
+
+    @timed("cache_lookup")
+    def lookup(self, key, approximate_key=None):
+        """Return (value, approximate): the exact entry if cached, else the approximate one.
+
+        approximate is True when the value came from approximate_key; value is
+        None when neither is cached.
+        """
+        value = self._get_exact(key)
+        if value is not None:
+            return value, False
+
+        if approximate_key is not None:
+            value = self._get_tiers(approximate_key)
+            if value is not None:
+                with self._lock:
+                    self.stats['approximate_hits'] += 1
+                return value, True
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None, False
+
+    def _get_exact(self, key):
+        """Both tiers, then the fallback; counts hits but not misses"""
+        value = self._get_tiers(key, count_hits=True)
+        if value is not None:
+            return value
+
+        if self.fallback is not None:
+            try:
+                value = self.fallback(key)
+            except Exception as e:
+                print(f"❌ Analysis cache fallback error: {e}")
+                value = None
+            if value is not None:
+                with self._lock:
+                    self.stats['fallback_hits'] += 1
+                self.set(key, value)
+                return value
+        return None
+
+    def _get_tiers(self, key, count_hits=False):
+        """Look key up in memory, then on disk (promoting disk hits to memory)"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if not self._is_expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    if count_hits:
+                        self.stats['memory_hits'] += 1
+                    return value
+                del self._memory[key]
+
+        if self.disk_enabled:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        "SELECT value, created_at FROM analyses WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None:
+                        value, created_at = row
+                        if self._is_expired(created_at, now):
+                            conn.execute("DELETE FROM analyses WHERE key = ?", (key,))
+                        else:
+                            conn.execute(
+                                "UPDATE analyses SET accessed_at = ? WHERE key = ?",
+                                (now, key),
+                            )
+                            with self._lock:
+                                self._remember(key, value, created_at)
+                                if count_hits:
+                                    self.stats['disk_hits'] += 1
+                            return value
+            except Exception as e:
+                print(f"❌ Analysis cache read error: {e}")
+        return None
+
+    def set(self, key, value, approximate_key=None):
+        """Store value in both tiers (also under approximate_key, if given)"""
+        now = time.time()
+        keys = [key] if approximate_key is None else [key, approximate_key]
+
+        with self._lock:
+            for entry_key in keys:
+                self._remember(entry_key, value, now)
+            self.stats['writes'] += 1
+
+        if self.disk_enabled:
+            try:
+                with self._connect() as conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO analyses (key, value, created_at, accessed_at)"
+                        " VALUES (?, ?, ?, ?)",
+                        [(entry_key, value, now, now) for entry_key in keys],
+                    )
+                    self._evict_disk(conn, now)
+            except Exception as e:
+                print(f"❌ Analysis cache write error: {e}")
+
+    def _remember(self, key, value, created_at):
+        """Insert into the memory tier, evicting least recently used entries"""
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _evict_disk(self, conn, now):
+        """Drop expired rows, then the least recently used rows over the size limit"""
+        if self.ttl_seconds is not None:
+            conn.execute(
+                "DELETE FROM analyses WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+        overflow = conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0] - self.max_disk_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM analyses WHERE key IN ("
+                " SELECT key FROM analyses ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,),
+            )
+            with self._lock:
+                self.stats['evictions'] += overflow
+
+    def clear(self):
+        """Remove every cached analysis"""
+        with self._lock:
+            self._memory.clear()
+        if self.disk_enabled:
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM analyses")
+            except Exception as e:
+                print(f"❌ Analysis cache clear error: {e}")
+
+    def get_stats(self):
+        """Return hit/miss counters plus the current hit rate"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._memory)
+        exact_hits = stats['memory_hits'] + stats['disk_hits'] + stats['fallback_hits']
+        lookups = exact_hits + stats['approximate_hits'] + stats['misses']
+        stats['hit_rate'] = (exact_hits + stats['approximate_hits']) / lookups if lookups else 0.0
+        stats['approximate_hit_rate'] = stats['approximate_hits'] / lookups if lookups else 0.0
+        return stats
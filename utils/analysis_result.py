@@ -0,0 +1,134 @@
+import re
+import json
+import math
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+DEMAND_LEVELS = ("High", "Medium", "Low")
+RECOMMENDATIONS = ("Good", "Fair", "Poor")
+# Words extract_metrics can pull from prose that aren't in RECOMMENDATIONS
+RECOMMENDATION_ALIASES = {"Excellent": "Good", "Strong": "Good", "Great": "Good", "Decent": "Good"}
+
+# Gemini responseSchema (OpenAPI subset) for JSON-mode analyses
+ANALYSIS_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "rent_estimate": {"type": "NUMBER", "description": "Estimated monthly rent in USD"},
+        "gross_yield": {"type": "NUMBER", "description": "Annual rent / purchase price, as a percentage"},
+        "demand": {"type": "STRING", "enum": list(DEMAND_LEVELS)},
+        "recommendation": {"type": "STRING", "enum": list(RECOMMENDATIONS)},
+        "narrative": {"type": "STRING", "description": "Concise investment analysis, under 300 words"},
+    },
+    "required": ["rent_estimate", "gross_yield", "demand", "recommendation", "narrative"],
+}
+
+
+@dataclass
+class AnalysisResult:
+    """One analysis as typed fields, ready to cache, batch or store without re-parsing"""
+    rent_estimate: Optional[float] = None
+    gross_yield: Optional[float] = None
+    demand: Optional[str] = None
+    recommendation: Optional[str] = None
+    narrative: str = ""
+    # 'json' when the model returned valid JSON, 'regex' when fields were scraped from prose,
+    # 'offline' when the local valuation model answered instead of a provider
+    source: str = "json"
+    error: Optional[str] = None
+    # Which provider answered (set by the analyzer; None for errors and older cache entries)
+    provider: Optional[str] = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @classmethod
+    def from_error(cls, message):
+        return cls(source="error", error=message)
+
+    @classmethod
+    def from_json(cls, text):
+        """Rebuild a result stored with to_json()"""
+        return cls(**json.loads(text))
+
+    def to_json(self):
+        return json.dumps(asdict(self), separators=(",", ":"))
+
+    @classmethod
+    def from_text(cls, text, metrics):
+        """Build a result from prose plus the dict returned by extract_metrics"""
+        rent_match = re.search(r"\$([\d,]+)", metrics.get('rental_value', ''))
+        yield_match = re.search(r"([\d.]+)%", metrics.get('yield', ''))
+        demand = metrics.get('demand')
+        recommendation = metrics.get('flip_potential')
+        recommendation = RECOMMENDATION_ALIASES.get(recommendation, recommendation)
+        return cls(
+            rent_estimate=float(rent_match.group(1).replace(",", "")) if rent_match else None,
+            gross_yield=float(yield_match.group(1)) if yield_match else None,
+            demand=demand if demand in DEMAND_LEVELS else None,
+            recommendation=recommendation if recommendation in RECOMMENDATIONS else None,
+            narrative=text,
+            source="regex",
+        )
+
+    def to_metrics(self):
+        """Same display dict as PropertyAIAnalyzer.extract_metrics"""
+        return {
+            'rental_value': f"${self.rent_estimate:,.0f}/mo" if self.rent_estimate is not None else 'See analysis',
+            'yield': f"{self.gross_yield:.1f}%" if self.gross_yield is not None else 'See analysis',
+            'demand': self.demand or 'See analysis',
+            'flip_potential': self.recommendation or 'See analysis',
+        }
+
+
+def _as_number(payload, field):
+    value = payload.get(field)
+    # bool is an int subclass, so float(True) would quietly give 1.0
+    if isinstance(value, bool):
+        raise ValueError(f"{field} is not a number: {value!r}")
+    if isinstance(value, str):
+        value = value.replace("$", "").replace(",", "").replace("%", "").strip()
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} is not a number: {value!r}")
+    if not math.isfinite(number):
+        raise ValueError(f"{field} is not a finite number: {value!r}")
+    if number < 0:
+        raise ValueError(f"{field} is negative: {number}")
+    return number
+
+
+def _as_choice(payload, field, choices):
+    value = str(payload.get(field, "")).strip().title()
+    if value not in choices:
+        raise ValueError(f"{field} must be one of {choices}, got {payload.get(field)!r}")
+    return value
+
+
+def parse_analysis_json(text):
+    """Parse and validate a JSON-mode response; raises ValueError if it doesn't fit the schema"""
+    cleaned = text.strip()
+    # Models sometimes wrap JSON in a markdown code fence despite the mime type
+    fence = re.match(r"^```(?:json)?\s*(.*?)\s*```$", cleaned, re.DOTALL)
+    if fence:
+        cleaned = fence.group(1)
+
+    try:
+        payload = json.loads(cleaned)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON: {e}")
+    if not isinstance(payload, dict):
+        raise ValueError("expected a JSON object")
+
+    narrative = payload.get("narrative")
+    if not isinstance(narrative, str) or not narrative.strip():
+        raise ValueError("narrative is missing")
+
+    return AnalysisResult(
+        rent_estimate=_as_number(payload, "rent_estimate"),
+        gross_yield=_as_number(payload, "gross_yield"),
+        demand=_as_choice(payload, "demand", DEMAND_LEVELS),
+        recommendation=_as_choice(payload, "recommendation", RECOMMENDATIONS),
+        narrative=narrative.strip(),
+    )
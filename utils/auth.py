@@ -1,46 +1,55 @@
 import streamlit as st
-import json
 import os
+import traceback
 from datetime import datetime, timedelta
 import hashlib
 
+from utils.user_store import JSONUserStore, SQLiteUserStore, UserMapping
+from utils.instrumentation import timed
+
 class AuthSystem:
-    def __init__(self, data_file='data/user_data.json'):
+    def __init__(self, data_file='data/user_data.json', backend=None, db_file='data/user_data.db'):
         # Use absolute path for Streamlit Cloud
         self.data_file = os.path.join(os.path.dirname(__file__), '..', data_file)
+        self.db_file = os.path.join(os.path.dirname(__file__), '..', db_file)
+        self.backend = backend or os.environ.get('AUTH_STORAGE_BACKEND', 'sqlite')
         self.load_user_data()
     
+    @timed("auth_load")
     def load_user_data(self):
-        """Load user data from JSON file"""
+        """Open the user store (migrating the legacy JSON file into SQLite on first run)"""
         try:
-            # Create data directory if it doesn't exist
-            os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
-            
-            if os.path.exists(self.data_file):
-                with open(self.data_file, 'r') as f:
-                    self.users = json.load(f)
+            if self.backend == 'sqlite':
+                self.store = SQLiteUserStore(self.db_file, migrate_from=self.data_file)
+            elif self.backend == 'json':
+                self.store = JSONUserStore(self.data_file)
             else:
-                self.users = {}
-                # Create initial file
-                self.save_user_data()
+                raise ValueError(f"Unknown storage backend: {self.backend}")
         except Exception as e:
-            st.error(f"Error loading user data: {e}")
-            self.users = {}
+            print(f"❌ Could not open the {self.backend} user store, falling back to an EMPTY in-memory store: {e}")
+            traceback.print_exc()
+            st.error(
+                f"Error loading user data: {e}. Existing accounts are unavailable and new sign-ups "
+                "will be lost on restart until this is fixed."
+            )
+            # Keep the app usable with in-memory users
+            self.store = JSONUserStore(None)
+        self.users = UserMapping(self.store)
     
     def save_user_data(self):
-        """Save user data to JSON file"""
-        try:
-            with open(self.data_file, 'w') as f:
-                json.dump(self.users, f, indent=2)
-            return True
-        except Exception as e:
-            st.error(f"Error saving user data: {e}")
-            return False
+        """Kept for compatibility: stores persist every change as it happens"""
+        return True
+    
+    @timed("auth_read")
+    def get_user(self, username):
+        """Return a copy of the user's record, or None"""
+        return self.store.get(username)
     
     def hash_password(self, password):
         """Simple password hashing"""
         return hashlib.sha256(password.encode()).hexdigest()
     
+    @timed("auth_write")
     def create_user(self, username, password, email, plan='free'):
         """Create new user account"""
         # Input validation
@@ -54,7 +63,7 @@ class AuthSystem:
             return False, "Password must be at least 3 characters"
         
         try:
-            self.users[username] = {
+            record = {
                 'password': self.hash_password(password),
                 'email': email,
                 'plan': plan,
@@ -64,23 +73,25 @@ class AuthSystem:
                 'last_reset': datetime.now().isoformat()
             }
             
-            if self.save_user_data():
+            if self.store.create(username, record):
                 return True, "User created successfully"
             else:
-                return False, "Failed to save user data"
+                return False, "Username already exists"
                 
         except Exception as e:
             return False, f"Error creating user: {str(e)}"
     
+    @timed("auth_read")
     def verify_user(self, username, password):
         """Verify user credentials"""
         if not username or not password:
             return False, "Username and password required"
         
-        if username not in self.users:
+        user = self.store.get(username)
+        if user is None:
             return False, "User not found"
         
-        stored_hash = self.users[username]['password']
+        stored_hash = user['password']
         input_hash = self.hash_password(password)
         
         if stored_hash != input_hash:
@@ -88,40 +99,46 @@ class AuthSystem:
         
         return True, "Login successful"
     
-    def check_usage_limit(self, username):
-        """Check if user has reached usage limit"""
-        if username not in self.users:
+    @timed("auth_read")
+    def check_usage_limit(self, username, user=None):
+        """Check if user has reached usage limit (pass the user record to skip reading it again)"""
+        if user is None:
+            user = self.store.get(username)
+        if user is None:
             return False
         
-        user = self.users[username]
-        
         # Reset monthly usage for free users
         try:
             last_reset = datetime.fromisoformat(user['last_reset'])
             if datetime.now() - last_reset > timedelta(days=30):
                 user['usage_count'] = 0
                 user['last_reset'] = datetime.now().isoformat()
-                self.save_user_data()
+                self.store.update(username, usage_count=0, last_reset=user['last_reset'])
         except:
             # If there's an error with reset logic, continue anyway
             pass
         
         return user['usage_count'] < user['max_uses']
     
+    @timed("auth_write")
     def increment_usage(self, username):
-        """Increment user usage count"""
-        if username in self.users:
-            self.users[username]['usage_count'] += 1
-            self.save_user_data()
+        """Increment user usage count.
+
+        Storage errors are raised for the caller to report: this also runs on
+        job queue worker threads, which have no page to show them on.
+        """
+        self.store.increment_usage(username)
     
+    @timed("auth_read")
     def get_user_plan(self, username):
         """Get user's subscription plan"""
-        return self.users.get(username, {}).get('plan', 'free')
+        return (self.store.get(username) or {}).get('plan', 'free')
     
+    @timed("auth_write")
     def upgrade_user(self, username, new_plan):
         """Upgrade user subscription"""
-        if username in self.users:
-            self.users[username]['plan'] = new_plan
-            self.users[username]['max_uses'] = float('inf')
-            return self.save_user_data()
-        return False
+        try:
+            return self.store.update(username, plan=new_plan, max_uses=float('inf'))
+        except Exception as e:
+            print(f"❌ Error saving user data: {e}")
+            return False
@@ -0,0 +1,216 @@
+import os
+import re
+import time
+from datetime import date
+
+import numpy as np
+
+from utils.comps_store import COLUMNS, PROPERTY_TYPES
+from utils.instrumentation import timed
+
+# Store column -> accepted source headers (lowercase, punctuation stripped), in order of preference
+COLUMN_ALIASES = {
+    'price': ('price', 'sale price', 'sold price', 'close price', 'closing price', 'list price', 'listing price',
+              'purchase price', 'current price'),
+    'rent': ('rent', 'monthly rent', 'rent estimate', 'estimated rent', 'lease price', 'rental value'),
+    'sqft': ('sqft', 'square feet', 'square footage', 'living area', 'living sqft', 'sq ft', 'building area',
+             'above grade finished area'),
+    'bedrooms': ('bedrooms', 'beds', 'bedrooms total', 'br', 'bd'),
+    'bathrooms': ('bathrooms', 'baths', 'bathrooms total', 'baths total', 'bathrooms total integer', 'ba'),
+    'year_built': ('year built', 'yearbuilt', 'yr built', 'built'),
+    'property_type': ('property type', 'property sub type', 'property subtype', 'type', 'home type', 'style'),
+}
+
+# Common MLS spellings of the app's property types (lowercase)
+PROPERTY_TYPE_ALIASES = {
+    'single family': 0, 'single family residence': 0, 'single family residential': 0, 'single family home': 0,
+    'sfr': 0, 'sfh': 0, 'house': 0, 'detached': 0, 'residential': 0,
+    'condo': 1, 'condominium': 1, 'condo/co-op': 1, 'co-op': 1, 'cooperative': 1, 'apartment': 1,
+    'townhouse': 2, 'townhome': 2, 'town house': 2, 'attached': 2, 'row house': 2,
+    'multi-family': 3, 'multi family': 3, 'multifamily': 3, 'duplex': 3, 'triplex': 3, 'fourplex': 3,
+    'quadruplex': 3, '2-4 units': 3, 'residential income': 3,
+}
+PROPERTY_TYPE_ALIASES.update({name.lower(): code for code, name in enumerate(PROPERTY_TYPES)})
+
+# Plausible values; anything outside becomes missing (a row without a valid price is dropped)
+VALID_RANGES = {
+    'price': (1_000, 100_000_000),
+    'rent': (100, 100_000),
+    'sqft': (100, 100_000),
+    'bedrooms': (0, 50),
+    'bathrooms': (0, 50),
+    'year_built': (1700, date.today().year + 2),
+}
+
+
+def _normalize_header(header):
+    """'Sale_Price ($)' -> 'sale price'"""
+    return re.sub(r'[^a-z0-9]+', ' ', str(header).lower()).strip()
+
+
+def match_columns(headers):
+    """{store column: source header} for the headers we recognize, preferring earlier aliases"""
+    by_name = {}
+    for header in headers:
+        by_name.setdefault(_normalize_header(header), header)
+    mapping = {}
+    for column, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in by_name:
+                mapping[column] = by_name[alias]
+                break
+    return mapping
+
+
+def _file_type(source, file_type):
+    if file_type:
+        return file_type.lower().lstrip('.')
+    name = source if isinstance(source, (str, os.PathLike)) else getattr(source, 'name', '')
+    extension = os.path.splitext(str(name))[1].lower().lstrip('.')
+    return 'parquet' if extension in ('parquet', 'pq') else 'csv'
+
+
+def _read_chunks(source, file_type, chunk_rows):
+    """Yield (mapping, DataFrame of the mapped source columns), chunk_rows rows at a time"""
+    import pandas as pd
+
+    if file_type == 'parquet':
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(source)
+        mapping = match_columns(parquet.schema_arrow.names)
+        if 'price' not in mapping:
+            raise ValueError(f"No price column found in {parquet.schema_arrow.names}")
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=list(mapping.values())):
+            yield mapping, batch.to_pandas()
+    elif file_type == 'csv':
+        # Read the header first so only recognized columns are parsed
+        header = pd.read_csv(source, nrows=0).columns
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        mapping = match_columns(header)
+        if 'price' not in mapping:
+            raise ValueError(f"No price column found in {list(header)}")
+        # Clean numeric columns parse in C; ones with '$' or ',' come back as text and are cleaned below
+        reader = pd.read_csv(source, usecols=list(mapping.values()), chunksize=chunk_rows, on_bad_lines='skip')
+        for chunk in reader:
+            yield mapping, chunk
+    else:
+        raise ValueError(f"Unsupported file type: {file_type} (expected csv or parquet)")
+
+
+def _numeric(series):
+    """float64 values of a column that may hold text like '$1,250,000'"""
+    import pandas as pd
+
+    if not pd.api.types.is_numeric_dtype(series):
+        series = series.astype(str).str.replace(r'[$,\s]', '', regex=True)
+    return pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+
+
+def normalize_chunk(chunk, mapping):
+    """{store column: float64 array} for one chunk, with out-of-range values set to NaN"""
+    n_rows = len(chunk)
+    columns = {}
+    for column in COLUMNS:
+        source = mapping.get(column)
+        if source is None:
+            columns[column] = np.full(n_rows, np.nan)
+        elif column == 'property_type':
+            names = chunk[source].astype(str).str.strip().str.lower()
+            columns[column] = names.map(PROPERTY_TYPE_ALIASES).to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+        else:
+            values = _numeric(chunk[source])
+            low, high = VALID_RANGES[column]
+            with np.errstate(invalid='ignore'):
+                values[(values < low) | (values > high)] = np.nan
+            columns[column] = values
+    return columns
+
+
+def row_hashes(columns):
+    """64-bit hash of each row across COLUMNS (NaN hashes like any other value)"""
+    hashes = np.full(len(columns['price']), 0xcbf29ce484222325, dtype=np.uint64)
+    for column in COLUMNS:
+        values = np.where(np.isnan(columns[column]), -1.0, columns[column]).astype(np.float64)
+        # FNV-style mix of the raw float bits; uint64 arithmetic wraps
+        hashes ^= values.view(np.uint64)
+        hashes *= np.uint64(0x100000001b3)
+        hashes ^= hashes >> np.uint64(29)
+    return hashes
+
+
+class RowDeduplicator:
+    """Remembers row hashes in one sorted uint64 array (8 bytes per distinct row)"""
+
+    def __init__(self):
+        self.seen = np.empty(0, dtype=np.uint64)
+
+    def add_store(self, store, chunk_rows=100_000):
+        """Remember every row already in the store, reading it a chunk at a time"""
+        count = store.count()
+        stored = store.columns(count)
+        for start in range(0, count, chunk_rows):
+            self.new_rows(row_hashes({column: stored[column][start:start + chunk_rows] for column in COLUMNS}))
+
+    def new_rows(self, hashes):
+        """Mask of rows not seen before (the first of any repeats within hashes counts as new)"""
+        unique, first = np.unique(hashes, return_index=True)
+        position = np.searchsorted(self.seen, unique)
+        found = position < len(self.seen)
+        found[found] = self.seen[position[found]] == unique[found]
+        mask = np.zeros(len(hashes), dtype=bool)
+        mask[first[~found]] = True
+        # Both sides are sorted, so one insert keeps seen sorted (no re-sort of everything seen)
+        self.seen = np.insert(self.seen, position[~found], unique[~found])
+        return mask
+
+
+@timed("comps_import")
+def import_comps(source, store, file_type=None, chunk_rows=50_000, skip_existing=True, progress=None):
+    """Stream a CSV or Parquet export of listings into a CompsStore.
+
+    source is a path or a file-like object (e.g. a Streamlit upload);
+    file_type defaults to the file extension. Only recognized columns are
+    parsed (see COLUMN_ALIASES), chunk_rows rows at a time, so memory stays
+    bounded by the chunk size plus 8 bytes per distinct row for duplicate
+    detection. Rows without a valid price are skipped, as are exact repeats
+    (of each other or, with skip_existing, of rows already stored).
+    progress(report) is called after every chunk. Returns the report.
+    """
+    started = time.monotonic()
+    report = {
+        'rows_read': 0,
+        'rows_imported': 0,
+        'rows_invalid': 0,
+        'rows_duplicate': 0,
+        'columns': {},
+        'seconds': 0.0,
+        'rows_per_second': 0.0,
+    }
+    deduplicator = RowDeduplicator()
+    if skip_existing:
+        deduplicator.add_store(store)
+
+    for mapping, chunk in _read_chunks(source, _file_type(source, file_type), chunk_rows):
+        report['columns'] = mapping
+        columns = normalize_chunk(chunk, mapping)
+        report['rows_read'] += len(chunk)
+
+        valid = np.isfinite(columns['price'])
+        report['rows_invalid'] += int(np.count_nonzero(~valid))
+        columns = {column: values[valid] for column, values in columns.items()}
+
+        new = deduplicator.new_rows(row_hashes(columns))
+        report['rows_duplicate'] += int(np.count_nonzero(~new))
+        report['rows_imported'] += store.append_columns({column: values[new] for column, values in columns.items()})
+
+        report['seconds'] = time.monotonic() - started
+        report['rows_per_second'] = report['rows_read'] / report['seconds'] if report['seconds'] > 0 else 0.0
+        if progress is not None:
+            progress(report)
+
+    report['seconds'] = time.monotonic() - started
+    report['rows_per_second'] = report['rows_read'] / report['seconds'] if report['seconds'] > 0 else 0.0
+    print(f"📥 Imported {report['rows_imported']:,} of {report['rows_read']:,} comps "
+          f"({report['rows_per_second']:,.0f} rows/s)")
+    return report
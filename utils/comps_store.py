@@ -0,0 +1,367 @@
+import os
+import json
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no flock, fall back to the in-process lock only
+    fcntl = None
+
+# One float64 file per column; missing values are NaN
+COLUMNS = ('price', 'rent', 'sqft', 'bedrooms', 'bathrooms', 'year_built', 'property_type')
+# property_type is stored as an index into this tuple
+PROPERTY_TYPES = ("Single Family", "Condo", "Townhouse", "Multi-Family")
+
+
+def encode_property_type(name):
+    return float(PROPERTY_TYPES.index(name)) if name in PROPERTY_TYPES else np.nan
+
+
+def decode_property_type(code):
+    if code is None or np.isnan(code) or not 0 <= int(code) < len(PROPERTY_TYPES):
+        return None
+    return PROPERTY_TYPES[int(code)]
+
+
+def _as_float(value):
+    """Column value for a record field: NaN for missing, zero or non-numeric values"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    return number if number > 0 else np.nan
+
+
+def _row_key(values):
+    """Hashable form of a row (NaN never compares equal, so map it to None)"""
+    return tuple(None if np.isnan(value) else value for value in values)
+
+
+class CompsStore:
+    """Append-only columnar store of properties and comps, read through memory maps.
+
+    Each column lives in `<directory>/<column>.f64` as raw float64 values and
+    meta.json holds the committed row count. Appends write the column files
+    first and bump the count last, so readers (and crashed writers) never see
+    a partial row; bytes past the count are ignored and overwritten next time.
+    A price-sorted copy of the first N rows can be kept in `sorted-<N>/`
+    (named by sorted.json) for CompsIndex, so it is shared across processes
+    and restarts instead of being rebuilt in memory.
+    """
+
+    def __init__(self, directory='data/comps'):
+        # Use absolute path for Streamlit Cloud
+        self.directory = os.path.join(os.path.dirname(__file__), '..', directory)
+        self.meta_file = os.path.join(self.directory, 'meta.json')
+        self.lock_file = os.path.join(self.directory, '.lock')
+        self.sorted_file = os.path.join(self.directory, 'sorted.json')
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _column_file(self, column):
+        return os.path.join(self.directory, f"{column}.f64")
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock across threads of this process and across processes"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_file, 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def count(self):
+        """Number of committed rows"""
+        try:
+            with open(self.meta_file, 'r') as f:
+                return json.load(f)['count']
+        except (FileNotFoundError, ValueError, KeyError):
+            return 0
+
+    def _write_json(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.meta-', suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _write_meta(self, count):
+        self._write_json(self.meta_file, {'count': count, 'columns': list(COLUMNS), 'property_types': list(PROPERTY_TYPES)})
+
+    def append_columns(self, columns):
+        """Append rows given as {column: array}; columns not given are NaN. Returns rows added."""
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) != 1:
+            raise ValueError("All columns must have the same length")
+        n_rows = lengths.pop()
+        if n_rows == 0:
+            return 0
+        unknown = set(columns) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown comps columns: {sorted(unknown)}")
+
+        with self._locked():
+            count = self.count()
+            for column in COLUMNS:
+                values = np.asarray(columns.get(column, np.full(n_rows, np.nan)), dtype=np.float64)
+                path = self._column_file(column)
+                mode = 'r+b' if os.path.exists(path) else 'wb'
+                with open(path, mode) as f:
+                    # Overwrite anything an interrupted append left past the committed rows
+                    f.seek(count * 8)
+                    f.write(values.tobytes())
+                    f.truncate()
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._write_meta(count + n_rows)
+        return n_rows
+
+    def append_records(self, records):
+        """Append property/comp dicts (price, rent, sqft, bedrooms, bathrooms, year_built, property_type)"""
+        # A row without a price can't be searched (the index is ordered by price)
+        records = [record for record in records if np.isfinite(_as_float(record.get('price')))]
+        columns = {column: np.array([_as_float(record.get(column)) for record in records]) for column in COLUMNS}
+        columns['property_type'] = np.array([encode_property_type(record.get('property_type')) for record in records])
+        return self.append_columns(columns)
+
+    def columns(self, count=None):
+        """Read-only memory maps of every column, limited to the first `count` committed rows"""
+        count = self.count() if count is None else count
+        if count == 0:
+            return {column: np.empty(0) for column in COLUMNS}
+        return {
+            column: np.memmap(self._column_file(column), dtype=np.float64, mode='r', shape=(count,))
+            for column in COLUMNS
+        }
+
+
+    def sorted_columns(self):
+        """(count, read-only memory maps) of the published price-sorted copy, or (0, None) if there isn't one"""
+        try:
+            with open(self.sorted_file, 'r') as f:
+                meta = json.load(f)
+            count, directory = meta['count'], os.path.join(self.directory, meta['directory'])
+            # A copy longer than the store belongs to data that has since been replaced
+            if count <= 0 or count > self.count():
+                return 0, None
+            return count, {
+                column: np.memmap(os.path.join(directory, f"{column}.f64"), dtype=np.float64, mode='r', shape=(count,))
+                for column in COLUMNS
+            }
+        except (FileNotFoundError, ValueError, KeyError):
+            return 0, None
+
+    def write_sorted(self, count, chunk_rows=1_000_000):
+        """Write the first `count` rows ordered by price (NaN last) and publish them; returns sorted_columns().
+
+        Columns are copied chunk by chunk through memory maps, so only the
+        permutation (8 bytes per row) is held in memory, not the columns.
+        """
+        if count <= 0:
+            return 0, None
+        columns = self.columns(count)
+        order = np.argsort(columns['price'], kind='stable')
+        tmp_directory = tempfile.mkdtemp(dir=self.directory, prefix='.sorted-')
+        for column in COLUMNS:
+            out = np.memmap(os.path.join(tmp_directory, f"{column}.f64"), dtype=np.float64, mode='w+', shape=(count,))
+            for start in range(0, count, chunk_rows):
+                out[start:start + chunk_rows] = columns[column][order[start:start + chunk_rows]]
+            out.flush()
+            del out
+
+        name = f"sorted-{count}"
+        previous = None
+        with self._locked():
+            if os.path.exists(os.path.join(self.directory, name)):
+                # Another process published the same copy first
+                shutil.rmtree(tmp_directory, ignore_errors=True)
+            else:
+                os.replace(tmp_directory, os.path.join(self.directory, name))
+            try:
+                with open(self.sorted_file, 'r') as f:
+                    previous = json.load(f).get('directory')
+            except (FileNotFoundError, ValueError):
+                pass
+            self._write_json(self.sorted_file, {'count': count, 'directory': name})
+        if previous and previous != name:
+            # Readers with the old copy mapped keep it until they refresh (POSIX keeps unlinked files readable)
+            shutil.rmtree(os.path.join(self.directory, previous), ignore_errors=True)
+        return self.sorted_columns()
+
+
+class CompsIndex:
+    """k-nearest-neighbour search over a CompsStore.
+
+    Rows are kept sorted by price; a query only scores the rows inside a
+    price window around the target (located with searchsorted), so the cost
+    depends on the window, not the store size. The sorted rows are the
+    store's persisted sorted copy, read through memory maps. Rows appended
+    since that copy are read straight from the column maps and scored by
+    brute force until there are enough of them to write a new copy.
+    Distance combines log price and sqft, beds, baths, year and a type
+    mismatch; a feature missing on a row costs MISSING_PENALTY.
+    """
+
+    # Feature -> distance scale (log-ratio for price/sqft, absolute difference for the rest)
+    LOG_FEATURES = {'price': 0.25, 'sqft': 0.25}
+    LINEAR_FEATURES = {'bedrooms': 1.0, 'bathrooms': 1.0, 'year_built': 15.0}
+    TYPE_MISMATCH = 1.0
+    MISSING_PENALTY = 1.0
+
+    def __init__(self, store, price_window=0.35, max_candidates=8000, max_unsorted=10000):
+        self.store = store
+        self.price_window = price_window
+        self.max_candidates = max_candidates
+        self.max_unsorted = max_unsorted
+        self._lock = threading.Lock()
+        # (count, sorted_count, columns, sorted columns), replaced as a whole under the lock so a
+        # query never pairs a new count with old sorted arrays. The sorted columns are ordered by
+        # price, so a price window is a contiguous slice.
+        self._state = (-1, 0, None, self._empty())
+
+    @staticmethod
+    def _empty():
+        return {column: np.empty(0) for column in COLUMNS}
+
+    def refresh(self):
+        """Pick up rows appended to the store and return a consistent snapshot of the index state.
+
+        Once the unsorted tail gets large, a newer sorted copy is taken from
+        the store (another process may have written one) or written.
+        """
+        count = self.store.count()
+        with self._lock:
+            if count == self._state[0]:
+                return self._state
+            _, sorted_count, _, sorted_columns = self._state
+            if count < sorted_count:
+                # The store was replaced; the old copy doesn't describe it
+                sorted_count, sorted_columns = 0, self._empty()
+            if count - sorted_count > self.max_unsorted:
+                published_count, published = self.store.sorted_columns()
+                if published is None or count - published_count > self.max_unsorted:
+                    published_count, published = self.store.write_sorted(count)
+                if published is not None:
+                    sorted_count, sorted_columns = published_count, published
+            self._state = (count, sorted_count, self.store.columns(count), sorted_columns)
+            return self._state
+
+    def __len__(self):
+        return self.refresh()[0]
+
+    def _candidates(self, state, target_price):
+        """Columns of the rows to score: the sorted rows in the price window plus the unsorted tail"""
+        count, sorted_count, columns, sorted_columns = state
+        sorted_price = sorted_columns['price']
+        if np.isnan(target_price):
+            lo, hi = 0, min(len(sorted_price), self.max_candidates)
+        else:
+            lo = np.searchsorted(sorted_price, target_price * (1 - self.price_window), side='left')
+            hi = np.searchsorted(sorted_price, target_price * (1 + self.price_window), side='right')
+            if hi - lo > self.max_candidates:
+                # Keep the rows closest in price
+                center = np.searchsorted(sorted_price, target_price)
+                lo = max(lo, min(center - self.max_candidates // 2, hi - self.max_candidates))
+                hi = lo + self.max_candidates
+
+        block = {column: np.asarray(sorted_columns[column][lo:hi]) for column in COLUMNS}
+        if count > sorted_count:
+            block = {
+                column: np.concatenate([block[column], columns[column][sorted_count:count]])
+                for column in COLUMNS
+            }
+        return block
+
+    def _distances(self, block, target):
+        total = np.zeros(len(block['price']))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for feature, scale in self.LOG_FEATURES.items():
+                wanted = _as_float(target.get(feature))
+                if np.isnan(wanted):
+                    continue
+                diff = np.log(block[feature] / wanted) / scale
+                total += np.where(np.isfinite(diff), diff * diff, self.MISSING_PENALTY)
+            for feature, scale in self.LINEAR_FEATURES.items():
+                wanted = _as_float(target.get(feature))
+                if np.isnan(wanted):
+                    continue
+                diff = (block[feature] - wanted) / scale
+                total += np.where(np.isfinite(diff), diff * diff, self.MISSING_PENALTY)
+        wanted_type = encode_property_type(target.get('property_type'))
+        if not np.isnan(wanted_type):
+            types = block['property_type']
+            total += np.where(np.isnan(types), self.MISSING_PENALTY,
+                              np.where(types == wanted_type, 0.0, self.TYPE_MISMATCH))
+        return total
+
+    def window(self, target, require=('sqft',)):
+        """Columns of every stored row in target's price window (the rows nearest() scores).
+
+        Rows missing any column in `require` are dropped. The result is
+        bounded by max_candidates plus the unsorted tail, however large the
+        store gets.
+        """
+        state = self.refresh()
+        if state[0] <= 0:
+            return self._empty()
+        block = self._candidates(state, _as_float(target.get('price')))
+        if require:
+            keep = np.logical_and.reduce([np.isfinite(block[column]) for column in require])
+            block = {column: values[keep] for column, values in block.items()}
+        return block
+
+    def nearest(self, target, k=3, require=('rent',), exclude=None):
+        """The k stored rows most similar to target (a property dict), closest first.
+
+        Rows missing any column in `require` are skipped, as are duplicates
+        and rows matching one of the `exclude` records on price, rent and sqft.
+        Returns a list of dicts with a 'distance' key.
+        """
+        state = self.refresh()
+        if state[0] <= 0 or k <= 0:
+            return []
+
+        block = self._candidates(state, _as_float(target.get('price')))
+        if require:
+            keep = np.logical_and.reduce([np.isfinite(block[column]) for column in require])
+            block = {column: values[keep] for column, values in block.items()}
+        if len(block['price']) == 0:
+            return []
+
+        distances = self._distances(block, target)
+        excluded = {
+            _row_key(_as_float(record.get(column)) for column in ('price', 'rent', 'sqft'))
+            for record in (exclude or [])
+        }
+        # Over-fetch a little so duplicates and excluded rows can be dropped
+        take = min(len(distances), k * 4 + len(excluded))
+        top = np.argpartition(distances, take - 1)[:take]
+        top = top[np.argsort(distances[top], kind='stable')]
+
+        results = []
+        seen = set()
+        for i in top:
+            values = tuple(float(block[column][i]) for column in COLUMNS)
+            key = _row_key(values)
+            if key in seen or key[:3] in excluded:
+                continue
+            seen.add(key)
+            record = {column: (None if np.isnan(value) else value) for column, value in zip(COLUMNS, values)}
+            record['property_type'] = decode_property_type(values[-1])
+            record['distance'] = float(distances[i])
+            results.append(record)
+            if len(results) == k:
+                break
+        return results
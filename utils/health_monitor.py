@@ -0,0 +1,132 @@
+import time
+import random
+import asyncio
+import threading
+import traceback
+
+
+class HealthMonitor:
+    """Probes every provider key on a background schedule and caches the results.
+
+    Each round checks all keys at once (a model-metadata request, no
+    generation quota) and stores the outcome, latency and time per key, so
+    status displays read the cache instead of calling the APIs themselves.
+    Rounds are `interval` seconds apart, +/- `jitter` as a fraction, so
+    several app processes don't probe in lockstep. Outcomes are also fed to
+    the analyzer: a provider that failed the startup probe comes back once a
+    key answers, and one whose keys all fail `failures_to_mark_down` rounds in
+    a row is marked unavailable (analyses then use the offline estimate).
+    """
+
+    # refresh() won't start a new round sooner than this after the last one
+    MIN_REFRESH_SECONDS = 10
+
+    def __init__(self, analyzer, interval=120, jitter=0.2, timeout=10, failures_to_mark_down=2):
+        self.analyzer = analyzer
+        self.interval = interval
+        self.jitter = jitter
+        self.timeout = timeout
+        self.failures_to_mark_down = failures_to_mark_down
+        self.rounds = 0
+        self.last_round_at = None
+        self._results = {}
+        self._failed_rounds = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the probe thread (once); the first round runs as soon as setup finishes"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+        self._thread.start()
+
+    def refresh(self):
+        """Ask for a round now instead of at the next scheduled time (returns immediately)"""
+        self._wakeup.set()
+
+    def _run(self):
+        self.analyzer.wait_until_ready()
+        while True:
+            try:
+                self.probe_all()
+            except Exception as e:
+                print(f"❌ Health probe round failed: {e}")
+                traceback.print_exc()
+            self._wakeup.wait(self.interval * random.uniform(1 - self.jitter, 1 + self.jitter))
+            self._wakeup.clear()
+            # Coalesce refresh requests that arrive right after a round
+            if self.last_round_at is not None:
+                time.sleep(max(0.0, self.last_round_at + self.MIN_REFRESH_SECONDS - time.time()))
+
+    def probe_all(self):
+        """Probe every configured key once (concurrently) and record the results"""
+        client = getattr(self.analyzer, 'client', None)
+        if client is None:
+            return
+        targets = [
+            (provider, api_key)
+            for provider in client.router.providers
+            for api_key in client.async_client.api_keys_for(provider)
+        ]
+
+        async def probe(provider, api_key):
+            started = time.monotonic()
+            try:
+                await client.async_client.probe(provider, api_key, timeout=self.timeout)
+                error = None
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            return provider, api_key, (time.monotonic() - started) * 1000, error
+
+        async def probe_round():
+            return await asyncio.gather(*(probe(provider, api_key) for provider, api_key in targets))
+
+        outcomes = client.run(probe_round(), timeout=self.timeout + 5)
+        checked_at = time.time()
+        with self._lock:
+            for provider, api_key, latency_ms, error in outcomes:
+                self._results[(provider, api_key)] = {
+                    'provider': provider,
+                    'key': f"{api_key[:10]}...",
+                    'ok': error is None,
+                    'latency_ms': round(latency_ms, 1),
+                    'error': error,
+                    'checked_at': checked_at,
+                }
+            self.rounds += 1
+            self.last_round_at = checked_at
+
+        for provider in {provider for provider, _ in targets}:
+            if any(error is None for name, _, _, error in outcomes if name == provider):
+                self._failed_rounds[provider] = 0
+                self.analyzer.set_provider_available(provider, True)
+            else:
+                self._failed_rounds[provider] = self._failed_rounds.get(provider, 0) + 1
+                if self._failed_rounds[provider] >= self.failures_to_mark_down:
+                    self.analyzer.set_provider_available(provider, False)
+
+    def snapshot(self):
+        """Latest result per key, with how long ago it was checked"""
+        now = time.time()
+        with self._lock:
+            return [
+                {**result, 'age_seconds': round(now - result['checked_at'], 1)}
+                for result in self._results.values()
+            ]
+
+    def provider_status(self):
+        """Per provider: healthy key count, fastest healthy latency and when it was last checked"""
+        status = {}
+        for result in self.snapshot():
+            provider = status.setdefault(result['provider'], {
+                'healthy_keys': 0, 'keys': 0, 'latency_ms': None, 'age_seconds': result['age_seconds'],
+            })
+            provider['keys'] += 1
+            provider['age_seconds'] = min(provider['age_seconds'], result['age_seconds'])
+            if result['ok']:
+                provider['healthy_keys'] += 1
+                if provider['latency_ms'] is None or result['latency_ms'] < provider['latency_ms']:
+                    provider['latency_ms'] = result['latency_ms']
+        return status
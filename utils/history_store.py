@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+
+class HistoryStore:
+    """Append-only log of every analysis a user has run (SQLite, WAL mode).
+
+    Rows are never updated; reads go through the (username, created_at)
+    index and page with keyset cursors, so a page costs the same no matter
+    how long the history is.
+    """
+
+    # Columns returned for list views; the full text is only loaded by get()
+    SUMMARY_COLUMNS = ('id', 'created_at', 'address', 'purchase_price', 'metrics', 'provider', 'latency_seconds', 'kind')
+
+    def __init__(self, db_file='data/history.db'):
+        # Use absolute path for Streamlit Cloud
+        self.db_file = os.path.join(os.path.dirname(__file__), '..', db_file)
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS analyses ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " username TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " kind TEXT NOT NULL,"
+                " cache_key TEXT,"
+                " address TEXT,"
+                " purchase_price REAL,"
+                " property_data TEXT NOT NULL,"
+                " comps_data TEXT NOT NULL,"
+                " analysis TEXT NOT NULL,"
+                " metrics TEXT NOT NULL,"
+                " provider TEXT,"
+                " latency_seconds REAL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_analyses_user_time"
+                " ON analyses (username, created_at DESC, id DESC)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_cache_key ON analyses (cache_key)")
+
+    def _connection(self):
+        """One connection per thread (Streamlit runs each session on its own thread)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=10)
+            conn.row_factory = sqlite3.Row
+            # WAL makes NORMAL durable enough and avoids an fsync per commit
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def record(self, username, property_data, comps_data, analysis, metrics, provider=None,
+               latency_seconds=None, cache_key=None, kind='text', failed=False):
+        """Append one analysis; returns its id.
+
+        kind is 'text' for the streamed narrative (whose text is the cache
+        value for cache_key) or 'structured' for JSON-mode/batch results.
+        Failed or partial analyses (failed=True) are kept in the history but
+        never under a cache_key, so lookup() can't serve them as cached analyses.
+        """
+        if failed:
+            cache_key = None
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO analyses (username, created_at, kind, cache_key, address, purchase_price,"
+                " property_data, comps_data, analysis, metrics, provider, latency_seconds)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    username,
+                    time.time(),
+                    kind,
+                    cache_key,
+                    property_data.get('address') or None,
+                    property_data.get('purchase_price'),
+                    json.dumps(property_data, default=str),
+                    json.dumps(comps_data, default=str),
+                    analysis,
+                    json.dumps(metrics or {}),
+                    provider,
+                    latency_seconds,
+                ),
+            )
+        return cursor.lastrowid
+
+    @staticmethod
+    def _summary(row):
+        entry = dict(row)
+        entry['metrics'] = json.loads(entry['metrics'])
+        return entry
+
+    def page(self, username, limit=20, before=None):
+        """Up to `limit` summaries, newest first, older than the `before` cursor.
+
+        The cursor is the (created_at, id) of the last entry of the previous
+        page (see cursor()); pass None for the first page.
+        """
+        query = "SELECT " + ", ".join(self.SUMMARY_COLUMNS) + " FROM analyses WHERE username = ?"
+        params = [username]
+        if before is not None:
+            query += " AND (created_at < ? OR (created_at = ? AND id < ?))"
+            params += [before[0], before[0], before[1]]
+        query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+        return [self._summary(row) for row in self._connection().execute(query, params)]
+
+    @staticmethod
+    def cursor(entry):
+        """Keyset cursor that continues after this summary"""
+        return (entry['created_at'], entry['id'])
+
+    def get(self, entry_id, username):
+        """The full entry (inputs, text, metrics), or None if it isn't this user's"""
+        row = self._connection().execute(
+            "SELECT * FROM analyses WHERE id = ? AND username = ?", (entry_id, username)
+        ).fetchone()
+        if row is None:
+            return None
+        entry = self._summary(row)
+        entry['property_data'] = json.loads(entry['property_data'])
+        entry['comps_data'] = json.loads(entry['comps_data'])
+        return entry
+
+    def count(self, username):
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM analyses WHERE username = ?", (username,)
+        ).fetchone()[0]
+
+    def lookup(self, cache_key, max_age_seconds=None):
+        """Most recent narrative stored under cache_key (any user), for warming the analysis cache"""
+        query = "SELECT analysis FROM analyses WHERE cache_key = ? AND kind = 'text'"
+        params = [cache_key]
+        if max_age_seconds is not None:
+            query += " AND created_at >= ?"
+            params.append(time.time() - max_age_seconds)
+        row = self._connection().execute(query + " ORDER BY id DESC LIMIT 1", params).fetchone()
+        return row[0] if row is not None else None
@@ -0,0 +1,168 @@
+import os
+import time
+import tempfile
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class RingHistogram:
+    """Durations of the most recent `size` observations, plus lifetime count and sum"""
+
+    def __init__(self, size=1024):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+
+    def observe(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def quantiles(self, quantiles=QUANTILES):
+        """Nearest-rank quantiles over the ring buffer (None when empty)"""
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: None for q in quantiles}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in quantiles}
+
+
+class Instrumentation:
+    """In-process timers for the app's hot paths.
+
+    Each stage keeps a ring-buffer histogram, so memory stays fixed however
+    long the process runs. A background thread can dump everything in
+    Prometheus text format to `prom_file` for a node-exporter style scrape.
+    """
+
+    def __init__(self, window=1024, prom_file='data/metrics.prom', export_interval=15):
+        self.window = window
+        # Use absolute path for Streamlit Cloud
+        self.prom_file = os.path.join(os.path.dirname(__file__), '..', prom_file)
+        self.export_interval = export_interval
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._exporter = None
+
+    def _histogram(self, stage):
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, RingHistogram(self.window))
+        return histogram
+
+    def observe(self, stage, seconds, error=False):
+        histogram = self._histogram(stage)
+        with self._lock:
+            histogram.observe(seconds)
+            if error:
+                histogram.errors += 1
+
+    @contextmanager
+    def span(self, stage):
+        """Time the enclosed block under `stage` (exceptions are counted as errors)"""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.observe(stage, time.perf_counter() - start, error=True)
+            raise
+        self.observe(stage, time.perf_counter() - start)
+
+    def timed(self, stage):
+        """Decorator version of span()"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        """One summary dict per stage, times in milliseconds"""
+        with self._lock:
+            stages = [
+                (stage, histogram.quantiles(), histogram.count, histogram.total, histogram.errors,
+                 max(histogram.samples) if histogram.samples else None)
+                for stage, histogram in sorted(self._histograms.items())
+            ]
+        rows = []
+        for stage, quantiles, count, total, errors, slowest in stages:
+            rows.append({
+                'stage': stage,
+                'count': count,
+                'errors': errors,
+                'mean_ms': round(total / count * 1000, 2) if count else None,
+                'p50_ms': _ms(quantiles[0.5]),
+                'p95_ms': _ms(quantiles[0.95]),
+                'p99_ms': _ms(quantiles[0.99]),
+                'max_ms': _ms(slowest),
+            })
+        return rows
+
+    def render_prometheus(self):
+        """All stages as a Prometheus summary (text exposition format)"""
+        lines = [
+            "# HELP property_ai_stage_duration_seconds Time spent per app stage (recent window quantiles).",
+            "# TYPE property_ai_stage_duration_seconds summary",
+        ]
+        errors = [
+            "# HELP property_ai_stage_errors_total Stage executions that raised.",
+            "# TYPE property_ai_stage_errors_total counter",
+        ]
+        with self._lock:
+            items = [(stage, histogram.quantiles(), histogram.count, histogram.total, histogram.errors)
+                     for stage, histogram in sorted(self._histograms.items())]
+        for stage, quantiles, count, total, error_count in items:
+            for q, value in quantiles.items():
+                if value is not None:
+                    lines.append(f'property_ai_stage_duration_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'property_ai_stage_duration_seconds_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'property_ai_stage_duration_seconds_count{{stage="{stage}"}} {count}')
+            errors.append(f'property_ai_stage_errors_total{{stage="{stage}"}} {error_count}')
+        return "\n".join(lines + errors) + "\n"
+
+    def export(self):
+        """Atomically (re)write the Prometheus file"""
+        directory = os.path.dirname(self.prom_file)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-', suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, self.prom_file)
+        return self.prom_file
+
+    def start_exporter(self):
+        """Write the Prometheus file every export_interval seconds on a daemon thread"""
+        if self._exporter is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(self.export_interval)
+                try:
+                    self.export()
+                except Exception as e:
+                    print(f"❌ Metrics export failed: {e}")
+
+        self._exporter = threading.Thread(target=run, name="metrics-exporter", daemon=True)
+        self._exporter.start()
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+# Shared by every module so all stages land in one registry
+instruments = Instrumentation()
+span = instruments.span
+timed = instruments.timed
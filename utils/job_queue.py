@@ -0,0 +1,265 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import traceback
+
+# Job lifecycle: queued -> running -> done | failed
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class QueueFullError(Exception):
+    """Raised by submit() when the queue already holds max_pending jobs"""
+
+
+class JobQueue:
+    """Durable queue of text analyses run by a local worker pool (SQLite, WAL mode).
+
+    Jobs live in a table rather than in the Streamlit script run, so they
+    finish (and are stored) even if the user reruns, navigates away or
+    disconnects; the UI polls get() with the job ID. A running job holds a
+    lease that its worker renews as text arrives; a job whose lease has
+    expired (its process crashed) is queued again by the next claim, up to
+    max_attempts, while jobs still running in another process are left alone.
+    on_complete(job) is called exactly once per job that
+    finishes with an analysis (not for failures or retries), which is where
+    usage is charged and the result is saved.
+    """
+
+    # Seconds between writes of the partial text while a job streams
+    PROGRESS_INTERVAL = 0.5
+    # A running job whose worker hasn't renewed its lease for this long is run again
+    LEASE_SECONDS = 300
+    # Finished jobs are deleted after this long (their results live in the history)
+    RETENTION_SECONDS = 7 * 24 * 3600
+
+    def __init__(self, analyzer, db_file='data/jobs.db', max_workers=4, max_pending=32,
+                 max_attempts=3, on_complete=None):
+        # Use absolute path for Streamlit Cloud
+        self.db_file = os.path.join(os.path.dirname(__file__), '..', db_file)
+        self.analyzer = analyzer
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.on_complete = on_complete
+
+        self._local = threading.local()
+        self._wakeup = threading.Condition()
+        self._workers = []
+        os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " username TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " started_at REAL,"
+                " heartbeat_at REAL,"
+                " finished_at REAL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " property_data TEXT NOT NULL,"
+                " comps_data TEXT NOT NULL,"
+                " nearby TEXT NOT NULL DEFAULT '[]',"
+                " analysis TEXT NOT NULL DEFAULT '',"
+                " provider TEXT,"
+                " error TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_time ON jobs (status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_user_time ON jobs (username, created_at DESC)")
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if 'heartbeat_at' not in columns:
+                # Databases created before leases existed
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+            if 'nearby' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN nearby TEXT NOT NULL DEFAULT '[]'")
+            conn.execute(
+                "DELETE FROM jobs WHERE status NOT IN ('queued', 'running') AND finished_at < ?",
+                (time.time() - self.RETENTION_SECONDS,),
+            )
+
+    def _connection(self):
+        """One connection per thread (workers and Streamlit sessions each get their own)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def start(self):
+        """Start the worker threads (once); they sleep until a job is submitted"""
+        if self._workers:
+            return
+        for i in range(self.max_workers):
+            worker = threading.Thread(target=self._work, name=f"analysis-job-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, username, property_data, comps_data, nearby=None):
+        """Queue an analysis and return its job ID; raises QueueFullError when the queue is full.
+
+        nearby (similar saved listings) is prompt context kept apart from
+        the inputs, so it never changes the analysis cache key.
+        """
+        conn = self._connection()
+        job_id = uuid.uuid4().hex
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            pending = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", ACTIVE_STATUSES
+            ).fetchone()[0]
+            if pending >= self.max_pending:
+                raise QueueFullError(f"{pending} analyses are already queued, please try again shortly")
+            conn.execute(
+                "INSERT INTO jobs (id, username, status, created_at, property_data, comps_data, nearby)"
+                " VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, username, time.time(), json.dumps(property_data, default=str),
+                 json.dumps(comps_data, default=str), json.dumps(nearby or [], default=str)),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    @staticmethod
+    def _job(row):
+        job = dict(row)
+        job['property_data'] = json.loads(job['property_data'])
+        job['comps_data'] = json.loads(job['comps_data'])
+        job['nearby'] = json.loads(job['nearby'])
+        return job
+
+    def get(self, job_id, username):
+        """The job (status, inputs, analysis so far), or None if it isn't this user's"""
+        row = self._connection().execute(
+            "SELECT * FROM jobs WHERE id = ? AND username = ?", (job_id, username)
+        ).fetchone()
+        return self._job(row) if row is not None else None
+
+    def active_job_id(self, username):
+        """ID of the user's oldest unfinished job, so a reconnecting session can resume polling it"""
+        row = self._connection().execute(
+            "SELECT id FROM jobs WHERE username = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+            (username, *ACTIVE_STATUSES),
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def get_stats(self):
+        """Job counts by status"""
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        stats = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0}
+        stats.update({status: count for status, count in rows})
+        stats['workers'] = len(self._workers)
+        return stats
+
+    def _claim(self):
+        """Mark the oldest queued job as running and return it (None if the queue is empty)"""
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # A 'running' job whose lease expired belongs to a process that is gone; run it again
+            conn.execute(
+                "UPDATE jobs SET status = 'queued' WHERE status = 'running'"
+                " AND COALESCE(heartbeat_at, started_at) < ?",
+                (now - self.LEASE_SECONDS,),
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ?,"
+                    " attempts = attempts + 1, analysis = '' WHERE id = ?",
+                    (now, now, row['id']),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        job = self._job(row)
+        job['attempts'] += 1
+        job['started_at'] = now
+        return job
+
+    def _work(self):
+        while True:
+            try:
+                job = self._claim()
+            except Exception as e:
+                print(f"❌ Job queue claim error: {e}")
+                job = None
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(timeout=5)
+                continue
+            if job['attempts'] > self.max_attempts:
+                self._finish(job, 'failed', error=f"Gave up after {self.max_attempts} attempts")
+                continue
+            try:
+                self._run(job)
+            except Exception as e:
+                print(f"❌ Analysis job {job['id']} crashed: {e}")
+                traceback.print_exc()
+                self._finish(job, 'failed', error=f"❌ Analysis failed: {e}")
+
+    def _run(self, job):
+        """Stream one analysis, saving the partial text as it arrives"""
+        conn = self._connection()
+        info = {}
+        analysis = ""
+        last_write = time.monotonic()
+        for chunk in self.analyzer.analyze_stream(job['property_data'], job['comps_data'], info=info,
+                                                  nearby=job['nearby']):
+            analysis += chunk
+            if time.monotonic() - last_write >= self.PROGRESS_INTERVAL:
+                # Saving progress also renews the lease
+                with conn:
+                    conn.execute(
+                        "UPDATE jobs SET analysis = ?, heartbeat_at = ? WHERE id = ? AND attempts = ?",
+                        (analysis, time.time(), job['id'], job['attempts']),
+                    )
+                last_write = time.monotonic()
+
+        job['analysis'] = analysis
+        job['provider'] = info.get('provider')
+        # A stream can fail after some text arrived; that partial text is not an analysis
+        if info.get('error'):
+            self._finish(job, 'failed', error=info['error'])
+        else:
+            self._finish(job, 'done')
+
+    def _finish(self, job, status, error=None):
+        """Store the outcome; on_complete runs only if this call moved the job to 'done'.
+
+        Matching on attempts means a worker whose lease expired (and whose job
+        was claimed again elsewhere) can't finish the newer attempt.
+        """
+        now = time.time()
+        job['status'] = status
+        job['latency_seconds'] = now - (job.get('started_at') or now)
+        conn = self._connection()
+        with conn:
+            updated = conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, analysis = ?, provider = ?, error = ?"
+                " WHERE id = ? AND status = 'running' AND attempts = ?",
+                (status, now, job.get('analysis') or '', job.get('provider'), error, job['id'], job['attempts']),
+            ).rowcount
+        if updated and status == 'done' and self.on_complete is not None:
+            try:
+                self.on_complete(job)
+            except Exception as e:
+                print(f"❌ Job completion hook failed for {job['id']}: {e}")
+                traceback.print_exc()
@@ -0,0 +1,189 @@
+import time
+import asyncio
+import threading
+
+
+class NoKeyAvailableError(Exception):
+    """Raised when every key in a pool is rate limited, over quota or disabled"""
+
+
+def _is_invalid_key(status_code, message):
+    """Whether a failure says the key itself is bad (revoked, mistyped, unauthorised)"""
+    if status_code in (401, 403):
+        return True
+    # Gemini answers a bad key with 400 INVALID_ARGUMENT / API_KEY_INVALID rather than 401
+    return status_code == 400 and ("api_key_invalid" in message or "api key not valid" in message)
+
+
+class TokenBucket:
+    """Classic token bucket: `rate_per_minute` tokens refill continuously up to `burst`"""
+
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst if burst is not None else max(1, rate_per_minute))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        if now <= self.updated:
+            return
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self, now):
+        self._refill(now)
+        return self.tokens
+
+    def take(self, now):
+        """Consume one token if possible; returns True on success"""
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def seconds_until_token(self, now):
+        tokens = min(self.capacity, self.tokens + max(0.0, now - self.updated) * self.rate)
+        if tokens >= 1:
+            return 0.0
+        return (1 - tokens) / self.rate if self.rate > 0 else float('inf')
+
+
+class _KeyState:
+    def __init__(self, key, rate_per_minute, burst):
+        self.key = key
+        self.bucket = TokenBucket(rate_per_minute, burst)
+        self.cooldown_until = 0.0
+        self.consecutive_quota_errors = 0
+        self.in_flight = 0
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.quota_errors = 0
+        self.last_error = None
+
+
+class APIKeyPool:
+    """Spreads requests over several API keys for one provider.
+
+    Each key has its own token-bucket rate limiter. Keys that hit a quota/429
+    error cool down (exponential backoff, reset on success); keys rejected as
+    invalid are parked for `invalid_key_cooldown` seconds.
+    """
+
+    def __init__(self, keys, rate_per_minute=15, burst=5, quota_cooldown=60,
+                 max_quota_cooldown=3600, invalid_key_cooldown=3600):
+        if not keys:
+            raise ValueError("APIKeyPool needs at least one key")
+        self.keys = list(keys)
+        self.quota_cooldown = quota_cooldown
+        self.max_quota_cooldown = max_quota_cooldown
+        self.invalid_key_cooldown = invalid_key_cooldown
+        self._states = {key: _KeyState(key, rate_per_minute, burst) for key in self.keys}
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Try to take a request slot.
+
+        Returns (key, 0) on success, or (None, seconds) with the time until a
+        slot could free up.
+        """
+        now = time.monotonic()
+        with self._lock:
+            healthy = [state for state in self._states.values() if state.cooldown_until <= now]
+            # Prefer the key with the most spare capacity, then the least busy one
+            ready = [state for state in healthy if state.bucket.available(now) >= 1]
+            if ready:
+                state = max(ready, key=lambda s: (s.bucket.tokens, -s.in_flight))
+                state.bucket.take(now)
+                state.in_flight += 1
+                state.requests += 1
+                return state.key, 0.0
+
+            waits = [state.bucket.seconds_until_token(now) for state in healthy]
+            waits += [state.cooldown_until - now for state in self._states.values() if state.cooldown_until > now]
+            return None, min(waits)
+
+    def acquire(self, max_wait=30):
+        """Blocking reserve(); raises NoKeyAvailableError if no key frees up within max_wait"""
+        deadline = time.monotonic() + max_wait
+        while True:
+            key, wait = self.reserve()
+            if key is not None:
+                return key
+            if time.monotonic() + wait > deadline:
+                raise NoKeyAvailableError("All API keys are over quota or rate limited")
+            time.sleep(wait)
+
+    async def acquire_async(self, max_wait=30):
+        """asyncio version of acquire()"""
+        deadline = time.monotonic() + max_wait
+        while True:
+            key, wait = self.reserve()
+            if key is not None:
+                return key
+            if time.monotonic() + wait > deadline:
+                raise NoKeyAvailableError("All API keys are over quota or rate limited")
+            await asyncio.sleep(wait)
+
+    def report_success(self, key):
+        with self._lock:
+            state = self._states[key]
+            state.in_flight = max(0, state.in_flight - 1)
+            state.successes += 1
+            state.consecutive_quota_errors = 0
+
+    def report_failure(self, key, error, status_code=None):
+        """Record a failed request; quota and auth errors take the key out of rotation for a while"""
+        now = time.monotonic()
+        message = str(error).lower()
+        with self._lock:
+            state = self._states[key]
+            state.in_flight = max(0, state.in_flight - 1)
+            state.failures += 1
+            state.last_error = str(error)
+
+            if status_code == 429 or "quota" in message or "exhausted" in message:
+                state.quota_errors += 1
+                state.consecutive_quota_errors += 1
+                cooldown = self.quota_cooldown * 2 ** (state.consecutive_quota_errors - 1)
+                state.cooldown_until = now + min(cooldown, self.max_quota_cooldown)
+            elif _is_invalid_key(status_code, message):
+                state.cooldown_until = now + self.invalid_key_cooldown
+
+    def release(self, key):
+        """Give back a reserved slot without counting a success or failure (e.g. cancelled request)"""
+        with self._lock:
+            state = self._states[key]
+            state.in_flight = max(0, state.in_flight - 1)
+
+    def is_retryable(self, status_code, error):
+        """Whether a failure is specific to the key, so another key might succeed"""
+        message = str(error).lower()
+        return (status_code == 429 or "quota" in message or "exhausted" in message
+                or _is_invalid_key(status_code, message))
+
+    def healthy_count(self):
+        now = time.monotonic()
+        with self._lock:
+            return sum(1 for state in self._states.values() if state.cooldown_until <= now)
+
+    def get_stats(self):
+        """Per-key counters, with keys shown only as a short prefix"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    'key': f"{state.key[:10]}...",
+                    'healthy': state.cooldown_until <= now,
+                    'cooldown_seconds': max(0.0, round(state.cooldown_until - now, 1)),
+                    'tokens': round(state.bucket.available(now), 2),
+                    'in_flight': state.in_flight,
+                    'requests': state.requests,
+                    'successes': state.successes,
+                    'failures': state.failures,
+                    'quota_errors': state.quota_errors,
+                    'last_error': state.last_error,
+                }
+                for state in self._states.values()
+            ]
@@ -0,0 +1,233 @@
+import warnings
+
+import numpy as np
+
+# Metrics the engine can compute exactly from the inputs (no model call needed)
+METRIC_COLUMNS = [
+    'price_per_sqft',
+    'comp_price_per_sqft',
+    'comp_rent_per_sqft',
+    'comp_avg_rent',
+    'implied_rent',
+    'gross_yield',
+    'price_vs_comps_pct',
+]
+
+
+def _safe_divide(numerator, denominator):
+    """Elementwise division that yields NaN instead of inf/warnings for zero or NaN denominators"""
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    result = np.full(np.broadcast(numerator, denominator).shape, np.nan)
+    valid = np.isfinite(denominator) & (denominator > 0)
+    np.divide(numerator, denominator, out=result, where=valid)
+    return result
+
+
+def _group_mean(values, groups, n_groups):
+    """Mean of values per group id, ignoring NaNs (NaN for groups with no valid values)"""
+    valid = np.isfinite(values)
+    totals = np.bincount(groups[valid], weights=values[valid], minlength=n_groups)
+    counts = np.bincount(groups[valid], minlength=n_groups)
+    return _safe_divide(totals, counts)
+
+
+def compute_metrics_arrays(sqft, purchase_price, comp_group, comp_price, comp_rent, comp_sqft):
+    """Core vectorized computation.
+
+    sqft and purchase_price have one entry per subject property; the comp_*
+    arrays have one entry per comparable, with comp_group giving the index of
+    the subject property each comp belongs to. Returns a dict of arrays, one
+    value per subject property (NaN where the inputs don't allow a number).
+    """
+    sqft = np.asarray(sqft, dtype=float)
+    purchase_price = np.asarray(purchase_price, dtype=float)
+    comp_group = np.asarray(comp_group, dtype=np.intp)
+    comp_price = np.asarray(comp_price, dtype=float)
+    comp_rent = np.asarray(comp_rent, dtype=float)
+    comp_sqft = np.asarray(comp_sqft, dtype=float)
+    n = sqft.shape[0]
+
+    # Zero rent/price on a comp means "not entered", not "free"
+    comp_rent = np.where(comp_rent > 0, comp_rent, np.nan)
+    comp_price = np.where(comp_price > 0, comp_price, np.nan)
+
+    comp_price_per_sqft = _group_mean(_safe_divide(comp_price, comp_sqft), comp_group, n)
+    comp_rent_per_sqft = _group_mean(_safe_divide(comp_rent, comp_sqft), comp_group, n)
+    comp_avg_rent = _group_mean(comp_rent, comp_group, n)
+
+    # Scale comp rent/sqft to the subject; fall back to the plain average when sqft is unknown
+    implied_rent = np.where(sqft > 0, sqft * comp_rent_per_sqft, np.nan)
+    implied_rent = np.where(np.isfinite(implied_rent), implied_rent, comp_avg_rent)
+
+    price_per_sqft = _safe_divide(purchase_price, sqft)
+
+    return {
+        'price_per_sqft': price_per_sqft,
+        'comp_price_per_sqft': comp_price_per_sqft,
+        'comp_rent_per_sqft': comp_rent_per_sqft,
+        'comp_avg_rent': comp_avg_rent,
+        'implied_rent': implied_rent,
+        'gross_yield': _safe_divide(implied_rent * 12, purchase_price) * 100,
+        'price_vs_comps_pct': (_safe_divide(price_per_sqft, comp_price_per_sqft) - 1) * 100,
+    }
+
+
+def compute_property_metrics(property_data, comps_data):
+    """Metrics for one property; values are floats or None when not computable"""
+    comps = (comps_data or {}).get('comparables', [])
+    results = compute_metrics_arrays(
+        [property_data.get('square_feet') or 0],
+        [property_data.get('purchase_price') or 0],
+        np.zeros(len(comps), dtype=np.intp),
+        [comp.get('price') or 0 for comp in comps],
+        [comp.get('rent') or 0 for comp in comps],
+        [comp.get('sqft') or 0 for comp in comps],
+    )
+    return {
+        name: float(values[0]) if np.isfinite(values[0]) else None
+        for name, values in results.items()
+    }
+
+
+def compute_portfolio_metrics(properties_df, comps_df, key='property_id'):
+    """Metrics for many properties at once.
+
+    properties_df needs key, square_feet and purchase_price columns;
+    comps_df needs key, price, rent and sqft. Returns properties_df with one
+    column per entry in METRIC_COLUMNS appended.
+    """
+    import pandas as pd
+
+    properties_df = properties_df.reset_index(drop=True)
+    comps_df = comps_df if comps_df is not None else pd.DataFrame(columns=[key, 'price', 'rent', 'sqft'])
+
+    # Map each comp to the row position of its subject property; drop comps with no subject
+    positions = pd.Index(properties_df[key]).get_indexer(comps_df[key])
+    matched = positions >= 0
+    comps_df = comps_df[matched]
+
+    results = compute_metrics_arrays(
+        pd.to_numeric(properties_df['square_feet'], errors='coerce').to_numpy(),
+        pd.to_numeric(properties_df['purchase_price'], errors='coerce').to_numpy(),
+        positions[matched],
+        pd.to_numeric(comps_df['price'], errors='coerce').to_numpy(),
+        pd.to_numeric(comps_df['rent'], errors='coerce').to_numpy(),
+        pd.to_numeric(comps_df['sqft'], errors='coerce').to_numpy(),
+    )
+    return properties_df.assign(**results)
+
+
+# Percentiles reported for every comparison measure
+COMPARISON_PERCENTILES = (10, 25, 50, 75, 90)
+COMPARISON_MEASURES = ('price', 'rent', 'price_per_sqft', 'rent_per_sqft')
+
+
+def compare_to_market(comp_price, comp_rent, comp_sqft, subject_price, subject_sqft):
+    """Per-sqft prices and rents of any number of comps, their spread, and where the subject sits.
+
+    Returns {'comps': {measure: array per comp, plus 'price_per_sqft_z'},
+    'summary': {measure: {'count', 'mean', 'std', 'p10'...'p90'}},
+    'subject': {'price_per_sqft', 'percentile', 'z_score', 'vs_median_pct'}}.
+    Values that can't be computed are NaN (arrays) or None (summary/subject).
+    """
+    price = np.asarray(comp_price, dtype=float)
+    rent = np.asarray(comp_rent, dtype=float)
+    sqft = np.asarray(comp_sqft, dtype=float)
+    # Zero rent/price on a comp means "not entered", not "free"
+    price = np.where(price > 0, price, np.nan)
+    rent = np.where(rent > 0, rent, np.nan)
+    measures = np.vstack([price, rent, _safe_divide(price, sqft), _safe_divide(rent, sqft)])
+
+    # All measures at once: one pass of counts, moments and percentiles over a (measure, comp) matrix
+    valid = np.isfinite(measures)
+    counts = valid.sum(axis=1)
+    filled = np.where(valid, measures, 0.0)
+    means = _safe_divide(filled.sum(axis=1), counts)
+    variances = _safe_divide((np.where(valid, measures - means[:, None], 0.0) ** 2).sum(axis=1), counts)
+    stds = np.sqrt(variances)
+    if measures.shape[1]:
+        with warnings.catch_warnings():
+            # All-NaN rows (e.g. no rents entered) just give NaN percentiles
+            warnings.simplefilter('ignore', RuntimeWarning)
+            percentiles = np.nanpercentile(measures, COMPARISON_PERCENTILES, axis=1)
+    else:
+        percentiles = np.full((len(COMPARISON_PERCENTILES), len(COMPARISON_MEASURES)), np.nan)
+
+    def number(value):
+        return float(value) if np.isfinite(value) else None
+
+    summary = {
+        measure: {
+            'count': int(counts[i]),
+            'mean': number(means[i]),
+            'std': number(stds[i]),
+            **{f'p{q}': number(percentiles[j, i]) for j, q in enumerate(COMPARISON_PERCENTILES)},
+        }
+        for i, measure in enumerate(COMPARISON_MEASURES)
+    }
+
+    price_per_sqft = measures[2]
+    subject_price_per_sqft = float(_safe_divide(subject_price or 0, subject_sqft or 0))
+    z_scores = _safe_divide(price_per_sqft - means[2], stds[2])
+    subject = {'price_per_sqft': None, 'percentile': None, 'z_score': None, 'vs_median_pct': None}
+    if np.isfinite(subject_price_per_sqft):
+        subject['price_per_sqft'] = subject_price_per_sqft
+        if counts[2]:
+            subject['percentile'] = float(np.count_nonzero(price_per_sqft < subject_price_per_sqft) / counts[2] * 100)
+        subject['z_score'] = number(_safe_divide(subject_price_per_sqft - means[2], stds[2]))
+        subject['vs_median_pct'] = number((_safe_divide(subject_price_per_sqft, percentiles[2, 2]) - 1) * 100)
+
+    return {
+        'comps': {**dict(zip(COMPARISON_MEASURES, measures)), 'price_per_sqft_z': z_scores},
+        'summary': summary,
+        'subject': subject,
+    }
+
+
+def histogram(values, bins=30, clip=(1, 99)):
+    """(bin centers, counts) of the finite values; the range is clipped to the given percentiles
+    so a few extreme listings don't squash everything into one bar"""
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    if values.size == 0:
+        return np.empty(0), np.empty(0, dtype=np.int64)
+    low, high = np.percentile(values, clip)
+    if high <= low:
+        low, high = values.min(), values.max() + 1
+    counts, edges = np.histogram(np.clip(values, low, high), bins=bins, range=(low, high))
+    return (edges[:-1] + edges[1:]) / 2, counts
+
+
+def binned_scatter(x, y, bins=25, clip=(1, 99)):
+    """Scatter of x vs y aggregated into at most bins x bins cells.
+
+    Returns (mean x, mean y, count) arrays for the non-empty cells, so the
+    size of the result doesn't depend on how many points went in.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = np.isfinite(x) & np.isfinite(y)
+    x, y = x[keep], y[keep]
+    if x.size == 0:
+        return np.empty(0), np.empty(0), np.empty(0, dtype=np.int64)
+    (x_low, y_low), (x_high, y_high) = np.percentile(np.column_stack([x, y]), clip, axis=0)
+    x_high, y_high = max(x_high, x_low + 1), max(y_high, y_low + 1)
+    x_bin = np.clip(((x - x_low) / (x_high - x_low) * bins).astype(np.intp), 0, bins - 1)
+    y_bin = np.clip(((y - y_low) / (y_high - y_low) * bins).astype(np.intp), 0, bins - 1)
+    cell = x_bin * bins + y_bin
+    counts = np.bincount(cell, minlength=bins * bins)
+    x_sums = np.bincount(cell, weights=x, minlength=bins * bins)
+    y_sums = np.bincount(cell, weights=y, minlength=bins * bins)
+    occupied = counts > 0
+    return x_sums[occupied] / counts[occupied], y_sums[occupied] / counts[occupied], counts[occupied]
+
+
+def format_quick_insights(metrics):
+    """Display strings for the Quick Insights rent and yield cards"""
+    rent = metrics.get('implied_rent')
+    gross_yield = metrics.get('gross_yield')
+    return {
+        'rental_value': f"${rent:,.0f}/mo" if rent is not None else None,
+        'yield': f"{gross_yield:.1f}%" if gross_yield is not None else None,
+    }
@@ -0,0 +1,300 @@
+import os
+import multiprocessing
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.instrumentation import timed
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Yearly capex (share of property value) and an up-front renovation budget (share of price), by condition
+CONDITION_CAPEX = {
+    'Excellent': (0.005, 0.0),
+    'Good': (0.008, 0.0),
+    'Fair': (0.012, 0.01),
+    'Poor': (0.018, 0.05),
+    'Needs Renovation': (0.025, 0.10),
+}
+
+DEFAULT_ASSUMPTIONS = {
+    'down_payment': 0.20,
+    'closing_cost_pct': 0.03,
+    'selling_cost_pct': 0.06,
+    'loan_years': 30,
+    # Taxes, insurance and management, as a share of collected rent
+    'expense_ratio': 0.30,
+    'discount_rate': 0.08,
+    # Each month is vacant with this probability, so vacant months per year are binomial
+    'vacancy_mean': 0.06,
+    # Each path gets its own long-run drift plus yearly noise (log returns)
+    'rent_growth_mean': 0.03,
+    'rent_growth_drift_sd': 0.01,
+    'rent_growth_sd': 0.02,
+    'appreciation_mean': 0.035,
+    'appreciation_drift_sd': 0.015,
+    'appreciation_sd': 0.05,
+    # Adjustable mortgage rate: mean-reverting (Vasicek) path, reset yearly
+    'initial_rate': 0.07,
+    'long_run_rate': 0.065,
+    'rate_reversion': 0.2,
+    'rate_sd': 0.01,
+    'min_rate': 0.01,
+    # Major repairs (roof, HVAC): yearly chance grows with age, cost is a share of value
+    'repair_probability': 0.03,
+    'repair_cost_range': (0.02, 0.06),
+    # Spreads used when there are too few comps to measure one
+    'default_rent_cv': 0.10,
+    'default_value_cv': 0.08,
+}
+
+
+def _spread(values):
+    """Mean and coefficient of variation of the positive values (None when there are none)"""
+    values = np.asarray([value for value in values if value and value > 0], dtype=float)
+    if not len(values):
+        return None, None
+    mean = values.mean()
+    cv = values.std(ddof=1) / mean if len(values) > 1 else None
+    return mean, cv
+
+
+def _comp_spreads(property_data, comps_data, assumptions):
+    """Starting rent and the rent/value uncertainty implied by the comps"""
+    comps = (comps_data or {}).get('comparables', [])
+    sqft = property_data.get('square_feet') or 0
+    price = property_data.get('purchase_price') or 0
+
+    rent_per_sqft, rent_cv = _spread(
+        comp['rent'] / comp['sqft'] if comp.get('rent') and comp.get('sqft') else None for comp in comps
+    )
+    if rent_per_sqft and sqft > 0:
+        rent = rent_per_sqft * sqft
+    else:
+        rent, rent_cv = _spread(comp.get('rent') for comp in comps)
+    # No usable comps: assume the common 0.8%-of-price monthly rent rule of thumb
+    if not rent:
+        rent = price * 0.008
+
+    _, value_cv = _spread(
+        comp['price'] / comp['sqft'] if comp.get('price') and comp.get('sqft') else None for comp in comps
+    )
+    return (
+        rent,
+        min(rent_cv if rent_cv is not None else assumptions['default_rent_cv'], 0.5),
+        min(value_cv if value_cv is not None else assumptions['default_value_cv'], 0.5),
+    )
+
+
+def _capex_profile(property_data, current_year):
+    """Yearly capex share, up-front renovation share and yearly major-repair chance multiplier"""
+    yearly, upfront = CONDITION_CAPEX.get(property_data.get('condition'), CONDITION_CAPEX['Fair'])
+    try:
+        age = max(0, current_year - int(property_data.get('year_built')))
+    except (TypeError, ValueError):
+        age = 30
+    # Older buildings need more upkeep and break more often
+    yearly += min(max(age - 20, 0) * 0.0001, 0.01)
+    return yearly, upfront, 1 + min(age, 100) / 50
+
+
+def _polyval(flows, x):
+    """sum(flows[t] * x**t) and its derivative in x, per path (Horner's rule).
+
+    flows is year-major, shape (years + 1, paths), so each step reads one contiguous row.
+    """
+    value = flows[-1].copy()
+    derivative = np.zeros_like(value)
+    for t in range(flows.shape[0] - 2, -1, -1):
+        derivative *= x
+        derivative += value
+        value *= x
+        value += flows[t]
+    return value, derivative
+
+
+def _irr(flows, iterations=50, tolerance=1e-7):
+    """IRR per column of year-major cash flows (NaN where undefined or not converged).
+
+    Newton's method on the discount factor x = 1 / (1 + r), all paths at once;
+    converged paths drop out, so late iterations only touch the stragglers.
+    """
+    paths = flows.shape[1]
+    x = np.full(paths, 1 / 1.08)
+    # An IRR only exists if money goes both in and out
+    defined = (flows.min(axis=0) < 0) & (flows.max(axis=0) > 0)
+    converged = np.zeros(paths, dtype=bool)
+    index = np.flatnonzero(defined)
+    active_flows = flows[:, index]
+    scale = np.abs(active_flows).sum(axis=0) + 1e-12
+    active_x = x[index]
+    for _ in range(iterations):
+        if not len(index):
+            break
+        value, derivative = _polyval(active_flows, active_x)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = np.where(derivative != 0, value / derivative, 0.0)
+        active_x = np.clip(active_x - step, 1e-3, 1e3)
+        done = np.abs(value) <= tolerance * scale
+        x[index] = active_x
+        converged[index[done]] = True
+        if done.any():
+            keep = ~done
+            index, active_x, scale = index[keep], active_x[keep], scale[keep]
+            active_flows = active_flows[:, keep]
+    rates = 1 / x - 1
+    rates[~converged] = np.nan
+    return rates
+
+
+def irr(cash_flows, iterations=50, tolerance=1e-7):
+    """Internal rate of return of each row of yearly cash flows, year 0 first (NaN where undefined)"""
+    flows = np.ascontiguousarray(np.asarray(cash_flows, dtype=float).T)
+    return _irr(flows, iterations, tolerance)
+
+
+def npv(cash_flows, discount_rate):
+    """Net present value of each row of yearly cash flows (year 0 first)"""
+    flows = np.ascontiguousarray(np.asarray(cash_flows, dtype=float).T)
+    return _polyval(flows, 1 / (1 + discount_rate))[0]
+
+
+def _summary(values):
+    finite = values[np.isfinite(values)]
+    if not len(finite):
+        return {'mean': None, **{f"p{p}": None for p in PERCENTILES}}
+    return {'mean': float(finite.mean()), **{f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(finite, PERCENTILES))}}
+
+
+@timed("monte_carlo")
+def simulate_property(property_data, comps_data, n_paths=100_000, years=30, seed=None,
+                      assumptions=None, current_year=None, keep_paths=False):
+    """Monte Carlo of yearly cash flows over a `years` hold, ending with a sale.
+
+    Rent starts from the comps (rent per sqft times the property's sqft) with
+    the comps' spread as uncertainty; vacancy, rent growth, appreciation,
+    capex, major repairs and an adjustable mortgage rate are simulated per
+    path and year. Returns IRR/NPV summaries (mean and PERCENTILES), the
+    number of paths left out of the IRR summary because no IRR was found,
+    the share of paths losing money (their cash flows, sale included, add
+    up to less than was put in, before any discounting) and yearly
+    cash-flow percentiles; with
+    keep_paths, also the raw 'irr_paths', 'npv_paths' and (paths x years)
+    'cash_flows' arrays.
+    """
+    a = dict(DEFAULT_ASSUMPTIONS, **(assumptions or {}))
+    rng = np.random.default_rng(seed)
+    price = float(property_data.get('purchase_price') or 0)
+    if price <= 0 or years < 1 or n_paths < 1:
+        raise ValueError("A purchase price, at least one year and at least one path are needed")
+
+    base_rent, rent_cv, value_cv = _comp_spreads(property_data, comps_data, a)
+    capex_share, upfront_share, repair_multiplier = _capex_profile(property_data, current_year or date.today().year)
+
+    # Per-path starting points and long-run drifts (lognormal, mean-preserving)
+    rent = base_rent * np.exp(rng.normal(-rent_cv ** 2 / 2, rent_cv, n_paths))
+    value = price * np.exp(rng.normal(-value_cv ** 2 / 2, value_cv, n_paths))
+    rent_drift = rng.normal(a['rent_growth_mean'], a['rent_growth_drift_sd'], n_paths)
+    value_drift = rng.normal(a['appreciation_mean'], a['appreciation_drift_sd'], n_paths)
+
+    loan_years = a['loan_years']
+    balance = np.full(n_paths, price * (1 - a['down_payment']))
+    rate = np.full(n_paths, a['initial_rate'])
+
+    repair_probability = min(a['repair_probability'] * repair_multiplier, 1.0)
+    repair_low, repair_high = a['repair_cost_range']
+
+    # Year-major, so each year's row is contiguous
+    cash_flows = np.empty((years + 1, n_paths))
+    cash_flows[0] = -price * (a['down_payment'] + a['closing_cost_pct'] + upfront_share)
+
+    # Paths are vectorized; only the years are a Python loop
+    for year in range(1, years + 1):
+        occupied_months = 12 - rng.binomial(12, a['vacancy_mean'], n_paths)
+        collected = rent * occupied_months
+
+        capex = value * capex_share
+        repairs = rng.random(n_paths) < repair_probability
+        capex[repairs] += value[repairs] * rng.uniform(repair_low, repair_high, repairs.sum())
+
+        # Adjustable-rate mortgage, re-amortized over the remaining term each year
+        remaining = loan_years - year + 1
+        if remaining > 0:
+            monthly_rate = rate / 12
+            log_growth = np.log1p(monthly_rate)
+            growth = np.exp(log_growth * (remaining * 12))
+            payment = balance * monthly_rate * growth / (growth - 1)
+            # Balance after 12 monthly payments
+            growth_year = np.exp(log_growth * 12)
+            balance = balance * growth_year - payment * (growth_year - 1) / monthly_rate
+            balance = np.maximum(balance, 0.0)
+            debt_service = payment * 12
+        else:
+            debt_service = 0.0
+
+        cash_flows[year] = collected * (1 - a['expense_ratio']) - capex - debt_service
+
+        # Next year's rent, value and rate
+        rent = rent * np.exp(rent_drift + rng.normal(0, a['rent_growth_sd'], n_paths) - a['rent_growth_sd'] ** 2 / 2)
+        value = value * np.exp(value_drift + rng.normal(0, a['appreciation_sd'], n_paths) - a['appreciation_sd'] ** 2 / 2)
+        rate = np.maximum(
+            rate + a['rate_reversion'] * (a['long_run_rate'] - rate) + rng.normal(0, a['rate_sd'], n_paths),
+            a['min_rate'],
+        )
+
+    # Sell at the end of the hold and repay what's left of the loan
+    cash_flows[years] += value * (1 - a['selling_cost_pct']) - balance
+
+    irrs = _irr(cash_flows)
+    # A path that never gets money back has no IRR; its limit is -100%, and
+    # dropping it would leave the worst outcomes out of the summary
+    irrs[cash_flows.max(axis=0) <= 0] = -1.0
+    npvs = _polyval(cash_flows, 1 / (1 + a['discount_rate']))[0]
+    result = {
+        'n_paths': n_paths,
+        'years': years,
+        'base_rent': base_rent,
+        'irr': _summary(irrs * 100),
+        'irr_undefined': int(np.count_nonzero(~np.isfinite(irrs))),
+        'npv': _summary(npvs),
+        'loss_probability': float(np.mean(cash_flows.sum(axis=0) < 0)),
+        'yearly_cash_flow': {
+            f"p{p}": values.tolist()
+            for p, values in zip(PERCENTILES, np.percentile(cash_flows[1:], PERCENTILES, axis=1).T)
+        },
+    }
+    if keep_paths:
+        result.update({'irr_paths': irrs, 'npv_paths': npvs, 'cash_flows': cash_flows.T})
+    return result
+
+
+def _simulate_item(args):
+    property_data, comps_data, n_paths, years, seed, assumptions = args
+    return simulate_property(property_data, comps_data, n_paths=n_paths, years=years, seed=seed,
+                             assumptions=assumptions)
+
+
+def simulate_portfolio(items, n_paths=20_000, years=30, seed=None, assumptions=None, processes=None):
+    """simulate_property for many (property_data, comps_data) pairs, in input order.
+
+    processes > 1 spreads the properties over a process pool (each simulation
+    is CPU-bound NumPy work, so threads wouldn't help); None uses one
+    process per CPU, 1 runs them in this process. Each property gets an
+    independent random stream derived from seed.
+
+    Workers are spawned, not forked: the app process has worker threads and
+    open SQLite connections, which a forked child would inherit mid-use.
+    """
+    items = list(items)
+    seeds = np.random.SeedSequence(seed).spawn(len(items))
+    jobs = [
+        (property_data, comps_data, n_paths, years, child_seed, assumptions)
+        for (property_data, comps_data), child_seed in zip(items, seeds)
+    ]
+    processes = processes or os.cpu_count() or 1
+    if processes <= 1 or len(jobs) <= 1:
+        return [_simulate_item(job) for job in jobs]
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(processes, len(jobs)), mp_context=context) as pool:
+        return list(pool.map(_simulate_item, jobs))
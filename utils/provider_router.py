@@ -0,0 +1,339 @@
+import time
+import asyncio
+import threading
+from collections import deque
+
+
+class LatencyTracker:
+    """Rolling window of recent request latencies and outcomes for one provider"""
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok):
+        with self._lock:
+            self._samples.append((seconds, ok))
+
+    def percentile(self, p):
+        """p-th percentile of successful request latencies, or None with no data"""
+        with self._lock:
+            latencies = sorted(seconds for seconds, ok in self._samples if ok)
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, max(0, int(round(p / 100 * (len(latencies) - 1)))))
+        return latencies[index]
+
+    def error_rate(self):
+        with self._lock:
+            if not self._samples:
+                return 0.0
+            return sum(1 for _, ok in self._samples if not ok) / len(self._samples)
+
+    def count(self):
+        with self._lock:
+            return len(self._samples)
+
+
+class CircuitBreaker:
+    """Stops sending traffic to a provider after repeated failures.
+
+    closed -> open after `failure_threshold` consecutive failures, or once at
+    least `error_rate_threshold` of the requests in the last `window_seconds`
+    failed (given at least `min_window_requests` of them), which catches a
+    provider that fails often but not back to back; open -> half_open after
+    `reset_timeout` seconds, letting one trial request through; the trial's
+    outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, error_rate_threshold=0.5,
+                 window_seconds=60, min_window_requests=10):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.error_rate_threshold = error_rate_threshold
+        self.window_seconds = window_seconds
+        self.min_window_requests = min_window_requests
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._trial_started = None
+        # (time, ok) of recent outcomes, oldest first
+        self._outcomes = deque()
+        self._lock = threading.Lock()
+
+    def _add_outcome(self, ok):
+        now = time.monotonic()
+        self._outcomes.append((now, ok))
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def error_rate(self):
+        """Share of failed requests in the current window (0.0 with no requests)"""
+        with self._lock:
+            now = time.monotonic()
+            recent = [ok for at, ok in self._outcomes if now - at <= self.window_seconds]
+        return recent.count(False) / len(recent) if recent else 0.0
+
+    def _error_rate_exceeded(self):
+        if len(self._outcomes) < self.min_window_requests:
+            return False
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        return failures / len(self._outcomes) >= self.error_rate_threshold
+
+    def allow_request(self):
+        """Whether a request may be sent now (doesn't claim the half-open trial)"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == 'open' and now - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                self._trial_started = None
+            if self.state == 'closed':
+                return True
+            # A trial that never reported back (e.g. a cancelled hedge) doesn't block forever
+            return self.state == 'half_open' and (
+                self._trial_started is None or now - self._trial_started >= self.reset_timeout
+            )
+
+    def on_request(self):
+        """Call when a request is actually sent; claims the trial slot when half-open"""
+        with self._lock:
+            if self.state == 'half_open':
+                self._trial_started = time.monotonic()
+
+    def record_success(self):
+        with self._lock:
+            if self.state != 'closed':
+                # Failures from before the trial shouldn't re-open the breaker straight away
+                self._outcomes.clear()
+            self.state = 'closed'
+            self.consecutive_failures = 0
+            self._trial_started = None
+            self._add_outcome(True)
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._add_outcome(False)
+            if (self.state == 'half_open' or self.consecutive_failures >= self.failure_threshold
+                    or self._error_rate_exceeded()):
+                self._open()
+
+    def record_cancelled(self):
+        """A cancelled request frees the trial slot without judging the provider"""
+        with self._lock:
+            self._trial_started = None
+
+    def trip(self):
+        """Open the breaker right away (e.g. the provider failed its startup probe)"""
+        with self._lock:
+            self._open()
+
+    def _open(self):
+        self.state = 'open'
+        self.opened_at = time.monotonic()
+        self._trial_started = None
+
+
+class ProviderRouter:
+    """Routes requests across providers by health and latency, hedging slow calls.
+
+    The first provider in `providers` whose breaker is closed is the primary.
+    If it hasn't answered within its recent p95 latency (`hedge_percentile`),
+    the same request is also sent to the next healthy provider and whichever
+    answer arrives first wins; the other request is cancelled.
+    """
+
+    def __init__(self, client, providers=("gemini", "openai"), hedge_percentile=95,
+                 default_hedge_delay=8.0, min_hedge_delay=0.5, min_samples=10,
+                 failure_threshold=5, reset_timeout=30, error_rate_threshold=0.5, error_window=60,
+                 min_window_requests=10):
+        self.client = client
+        self.providers = list(providers)
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.latency = {provider: LatencyTracker() for provider in self.providers}
+        self.first_token = {provider: LatencyTracker() for provider in self.providers}
+        self.breakers = {
+            provider: CircuitBreaker(failure_threshold, reset_timeout, error_rate_threshold, error_window,
+                                     min_window_requests)
+            for provider in self.providers
+        }
+        self.stats = {'requests': 0, 'hedged': 0, 'hedge_wins': 0, 'failovers': 0}
+
+    def is_configured(self, provider):
+        return provider in self.client.key_pools or bool(self.client.api_keys.get(provider))
+
+    def candidates(self):
+        """Configured providers in preference order, skipping ones with an open breaker"""
+        return [
+            provider for provider in self.providers
+            if self.is_configured(provider) and self.breakers[provider].allow_request()
+        ]
+
+    def hedge_delay(self, provider, tracker=None):
+        """How long to wait on provider before hedging: its p95, once there's enough data"""
+        tracker = tracker or self.latency[provider]
+        if tracker.count() < self.min_samples:
+            return self.default_hedge_delay
+        p95 = tracker.percentile(self.hedge_percentile)
+        return max(self.min_hedge_delay, p95 if p95 is not None else self.default_hedge_delay)
+
+    def _record(self, provider, tracker, seconds, error):
+        if error is None:
+            tracker.record(seconds, True)
+            self.breakers[provider].record_success()
+        elif isinstance(error, Exception):
+            tracker.record(seconds, False)
+            self.breakers[provider].record_failure()
+        else:
+            # Cancelled requests (lost hedges) say nothing about the provider's health
+            self.breakers[provider].record_cancelled()
+
+    async def _tracked_generate(self, provider, prompt, generation_config):
+        self.breakers[provider].on_request()
+        start = time.monotonic()
+        try:
+            text = await self.client.generate(provider, prompt, generation_config)
+        except BaseException as e:
+            self._record(provider, self.latency[provider], time.monotonic() - start, e)
+            raise
+        self._record(provider, self.latency[provider], time.monotonic() - start, None)
+        return provider, text
+
+    async def generate(self, prompt, generation_config=None):
+        """Return (provider, text) from the fastest healthy provider"""
+        self.stats['requests'] += 1
+        candidates = self.candidates()
+        if not candidates:
+            raise RuntimeError("No AI providers are currently available (all circuit breakers open)")
+
+        primary = asyncio.ensure_future(self._tracked_generate(candidates[0], prompt, generation_config))
+        if len(candidates) == 1:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay(candidates[0]))
+        if done and primary.exception() is None:
+            return primary.result()
+
+        secondary = asyncio.ensure_future(self._tracked_generate(candidates[1], prompt, generation_config))
+        if done:
+            # Primary already failed: plain failover
+            self.stats['failovers'] += 1
+            return await secondary
+
+        self.stats['hedged'] += 1
+        pending = {primary, secondary}
+        last_error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is secondary:
+                            self.stats['hedge_wins'] += 1
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _open_stream(self, provider, prompt, generation_config):
+        """Start a stream and wait for its first chunk; returns (provider, first_chunk, stream, start_time)"""
+        self.breakers[provider].on_request()
+        stream = self.client.stream(provider, prompt, generation_config)
+        start = time.monotonic()
+        try:
+            first = await stream.__anext__()
+        except StopAsyncIteration:
+            first = ""
+        except BaseException as e:
+            self._record(provider, self.first_token[provider], time.monotonic() - start, e)
+            await stream.aclose()
+            raise
+        # Only the latency sample here: the stream can still fail, so the breaker hears at its end
+        self.first_token[provider].record(time.monotonic() - start, True)
+        return provider, first, stream, start
+
+    async def stream(self, prompt, generation_config=None):
+        """Yield (provider, chunk) pairs, hedging on time to first token"""
+        self.stats['requests'] += 1
+        candidates = self.candidates()
+        if not candidates:
+            raise RuntimeError("No AI providers are currently available (all circuit breakers open)")
+
+        opening = {asyncio.ensure_future(self._open_stream(candidates[0], prompt, generation_config))}
+        hedged = False
+        if len(candidates) > 1:
+            done, _ = await asyncio.wait(
+                opening, timeout=self.hedge_delay(candidates[0], self.first_token[candidates[0]])
+            )
+            if not done or next(iter(done)).exception() is not None:
+                if done:
+                    self.stats['failovers'] += 1
+                    opening = set()
+                else:
+                    self.stats['hedged'] += 1
+                    hedged = True
+                opening.add(asyncio.ensure_future(self._open_stream(candidates[1], prompt, generation_config)))
+
+        winner = None
+        last_error = None
+        try:
+            while opening and winner is None:
+                done, opening = await asyncio.wait(opening, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and winner is None:
+                        winner = task.result()
+                    elif task.exception() is not None:
+                        last_error = task.exception()
+                    else:
+                        # Both opened in the same tick; close the extra stream
+                        extra_provider, _, extra_stream, _ = task.result()
+                        await extra_stream.aclose()
+                        self.breakers[extra_provider].record_cancelled()
+        finally:
+            for task in opening:
+                task.cancel()
+
+        if winner is None:
+            raise last_error
+
+        provider, first, stream, start = winner
+        if hedged and provider != candidates[0]:
+            self.stats['hedge_wins'] += 1
+        error = None
+        try:
+            if first:
+                yield provider, first
+            async for text in stream:
+                yield provider, text
+        except BaseException as e:
+            # An exception is a failure; the consumer stopping early (GeneratorExit, cancellation) is neither
+            error = e
+            raise
+        finally:
+            await stream.aclose()
+            # One breaker outcome per stream, once it has ended
+            self._record(provider, self.latency[provider], time.monotonic() - start, error)
+
+    def get_stats(self):
+        """Router counters plus per-provider latency, error rate and breaker state"""
+        providers = {}
+        for provider in self.providers:
+            p50 = self.latency[provider].percentile(50)
+            p95 = self.latency[provider].percentile(95)
+            ttft = self.first_token[provider].percentile(50)
+            providers[provider] = {
+                'configured': self.is_configured(provider),
+                'breaker': self.breakers[provider].state,
+                'breaker_error_rate': round(self.breakers[provider].error_rate(), 3),
+                'p50_seconds': round(p50, 3) if p50 is not None else None,
+                'p95_seconds': round(p95, 3) if p95 is not None else None,
+                'ttft_p50_seconds': round(ttft, 3) if ttft is not None else None,
+                'error_rate': round(self.latency[provider].error_rate(), 3),
+                'samples': self.latency[provider].count(),
+            }
+        return {**self.stats, 'providers': providers}
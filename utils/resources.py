@@ -0,0 +1,90 @@
+import streamlit as st
+
+from utils.auth import AuthSystem
+from utils.ai_helpers import PropertyAIAnalyzer
+from utils.analysis_cache import AnalysisCache
+from utils.history_store import HistoryStore
+from utils.job_queue import JobQueue
+from utils.instrumentation import instruments
+
+# Shared across app.py and every page so all sessions use one instance of each
+@st.cache_resource
+def get_auth_system():
+    return AuthSystem()
+
+@st.cache_resource
+def get_history_store():
+    return HistoryStore()
+
+@st.cache_resource
+def get_ai_analyzer():
+    # Analyses evicted from the cache can still be served from the history
+    history = get_history_store()
+    cache = AnalysisCache(fallback=lambda key: history.lookup(key, max_age_seconds=30 * 24 * 3600))
+    # With no provider reachable, analyses come from the local valuation model instead
+    return PropertyAIAnalyzer(cache=cache, offline_model=get_valuation_model)
+
+@st.cache_resource
+def get_health_monitor():
+    # One probe thread per process; the sidebar, diagnostics and Debug page read its cache
+    from utils.health_monitor import HealthMonitor
+    monitor = HealthMonitor(get_ai_analyzer())
+    monitor.start()
+    return monitor
+
+@st.cache_resource
+def get_job_queue():
+    auth_system = get_auth_system()
+    ai_analyzer = get_ai_analyzer()
+    history = get_history_store()
+
+    def on_complete(job):
+        # Runs once per finished job, so a rerun, retry or disconnect never charges twice
+        username, property_data, comps_data = job['username'], job['property_data'], job['comps_data']
+        offline = job['provider'] == 'offline'
+        # Offline estimates cost no model call, so they aren't charged, and they aren't
+        # stored under the cache key (the history would serve them as a cached analysis)
+        if not offline:
+            try:
+                auth_system.increment_usage(username)
+            except Exception as e:
+                # This runs on a worker thread (no page to show it on); still save the analysis
+                print(f"❌ Could not record usage for {username} (job {job['id']}): {e}")
+        history.record(
+            username, property_data, comps_data, job['analysis'], ai_analyzer.extract_metrics(job['analysis']),
+            provider=job['provider'], latency_seconds=job['latency_seconds'],
+            cache_key=None if offline else ai_analyzer.get_cache_key(property_data, comps_data),
+            failed=job['status'] != 'done'
+        )
+        # Keep the property and its comps so later analyses can find them
+        property_record = {
+            "price": property_data['purchase_price'],
+            "sqft": property_data['square_feet'],
+            "bedrooms": property_data['bedrooms'],
+            "bathrooms": property_data['bathrooms'],
+            "year_built": property_data['year_built'],
+            "property_type": property_data['property_type'],
+        }
+        get_comps_index().store.append_records([property_record] + comps_data['comparables'])
+
+    queue = JobQueue(ai_analyzer, on_complete=on_complete)
+    queue.start()
+    return queue
+
+@st.cache_resource
+def get_comps_index():
+    # The store is numpy-backed, so it is only imported once comps are needed
+    from utils.comps_store import CompsStore, CompsIndex
+    return CompsIndex(CompsStore())
+
+@st.cache_resource
+def get_valuation_model():
+    # Fit on the comps store, so it needs numpy; only loaded once an estimate is asked for
+    from utils.valuation_model import ValuationModel
+    return ValuationModel(get_comps_index().store)
+
+@st.cache_resource
+def get_instrumentation():
+    # One exporter thread per process keeps data/metrics.prom fresh for scraping
+    instruments.start_exporter()
+    return instruments
@@ -0,0 +1,113 @@
+import numpy as np
+
+from utils.instrumentation import timed
+
+# Metrics the grid computes, with their display labels
+GRID_METRICS = {
+    'gross_yield': "Gross Yield (%)",
+    'cap_rate': "Cap Rate (%)",
+    'cash_on_cash': "Cash-on-Cash (%)",
+    'monthly_cash_flow': "Monthly Cash Flow ($)",
+}
+
+# Axis order of every grid array
+GRID_AXES = ('price_change', 'rent_change', 'interest_rate', 'down_payment')
+
+
+def _monthly_payment_factor(interest_rates, loan_years):
+    """Monthly mortgage payment per dollar borrowed, for each annual rate"""
+    rates = np.asarray(interest_rates, dtype=float) / 12
+    periods = loan_years * 12
+    factor = np.full(rates.shape, 1.0 / periods)
+    nonzero = rates > 0
+    factor[nonzero] = rates[nonzero] / (1 - (1 + rates[nonzero]) ** -periods)
+    return factor
+
+
+@timed("sensitivity_grid")
+def compute_sensitivity_grid(purchase_price, monthly_rent, price_changes, rent_changes, interest_rates,
+                             down_payments, loan_years=30, expense_ratio=0.35, closing_cost_pct=0.03):
+    """Investment metrics over every price x rent x interest rate x down payment combination.
+
+    price_changes and rent_changes are fractions relative to purchase_price
+    and monthly_rent (e.g. -0.05 for 5% less); interest_rates and
+    down_payments are fractions too. expense_ratio is the share of rent lost
+    to vacancy, taxes, insurance and upkeep. Returns one float32 array per
+    GRID_METRICS entry, shaped (len(price_changes), len(rent_changes),
+    len(interest_rates), len(down_payments)); cells that can't be computed
+    (zero price or zero cash invested) are NaN.
+    """
+    price = purchase_price * (1 + np.asarray(price_changes, dtype=float))[:, None, None, None]
+    rent = monthly_rent * (1 + np.asarray(rent_changes, dtype=float))[None, :, None, None]
+    rate_factor = _monthly_payment_factor(interest_rates, loan_years)[None, None, :, None]
+    down = np.asarray(down_payments, dtype=float)[None, None, None, :]
+
+    # Price and rent alone set yield and cap rate, so compute them on the small (P, R) plane
+    with np.errstate(divide='ignore', invalid='ignore'):
+        valid_price = np.where(price > 0, price, np.nan)
+        net_rent = rent * (1 - expense_ratio)
+        gross_yield = rent * 12 / valid_price * 100
+        cap_rate = net_rent * 12 / valid_price * 100
+
+        # Only the financing terms need the full grid
+        payment = (price * (1 - down)) * rate_factor
+        monthly_cash_flow = net_rent - payment
+        cash_invested = price * (down + closing_cost_pct)
+        cash_on_cash = np.where(cash_invested > 0, monthly_cash_flow * 12 / cash_invested * 100, np.nan)
+
+    shape = (price.shape[0], rent.shape[1], rate_factor.shape[2], down.shape[3])
+    return {
+        'gross_yield': np.broadcast_to(gross_yield.astype(np.float32), shape),
+        'cap_rate': np.broadcast_to(cap_rate.astype(np.float32), shape),
+        'cash_on_cash': cash_on_cash.astype(np.float32),
+        'monthly_cash_flow': monthly_cash_flow.astype(np.float32),
+    }
+
+
+def grid_slice(grid, metric, rows, columns, fixed):
+    """2-D view of one metric with `rows` x `columns` axes, other axes fixed at the given indices.
+
+    rows and columns are names from GRID_AXES; fixed maps each remaining
+    axis name to an index along it.
+    """
+    index = tuple(slice(None) if axis in (rows, columns) else fixed[axis] for axis in GRID_AXES)
+    values = grid[metric][index]
+    # Indexing keeps the axes in GRID_AXES order; flip if rows comes after columns
+    if GRID_AXES.index(rows) > GRID_AXES.index(columns):
+        values = values.T
+    return values
+
+
+def summarize_grid(grid):
+    """Headline numbers over the whole grid"""
+    cash_flow = grid['monthly_cash_flow']
+    finite = np.isfinite(cash_flow)
+    cells = cash_flow.size
+    return {
+        'cells': cells,
+        'positive_cash_flow_pct': float(np.count_nonzero(cash_flow > 0) / cells * 100) if cells else 0.0,
+        'best_cash_flow': float(cash_flow[finite].max()) if finite.any() else None,
+        'worst_cash_flow': float(cash_flow[finite].min()) if finite.any() else None,
+    }
+
+
+def heatmap_colors(values):
+    """CSS background per cell: red below zero, green above, scaled by magnitude"""
+    values = np.asarray(values, dtype=float)
+    finite = np.isfinite(values)
+    scale = np.abs(values[finite]).max() if finite.any() else 0.0
+    strength = np.zeros(values.shape)
+    if scale > 0:
+        strength[finite] = np.clip(values[finite] / scale, -1, 1)
+    # Blend from white toward green (positive) or red (negative)
+    fade = (255 - np.abs(strength) * 155).astype(int)
+    red = np.where(strength < 0, 255, fade)
+    green = np.where(strength > 0, 255 - (np.abs(strength) * 60).astype(int), fade)
+    blue = fade
+    css = np.empty(values.shape, dtype=object)
+    for position in np.ndindex(values.shape):
+        if finite[position]:
+            css[position] = f"background-color: rgb({red[position]}, {green[position]}, {blue[position]}); color: black"
+        else:
+            css[position] = ""
+    return css
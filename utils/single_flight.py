@@ -0,0 +1,125 @@
+import threading
+
+
+class _Call:
+    """One in-flight call and everyone waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _StreamCall:
+    """One in-flight stream; chunks are buffered so late joiners replay from the start"""
+
+    def __init__(self):
+        self.chunks = []
+        self.finished = False
+        self.error = None
+        self.condition = threading.Condition()
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls into one.
+
+    Callers passing the same key while a call for it is running wait for that
+    call and share its result (or exception) instead of starting their own.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'executions': 0,
+            'coalesced': 0,
+            'stream_executions': 0,
+            'stream_coalesced': 0,
+        }
+
+    def do(self, key, fn):
+        """Return fn()'s result, running fn at most once per key at a time"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats['executions'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stream(self, key, make_iterator):
+        """Yield the items of make_iterator(), sharing one iteration per key.
+
+        The iteration runs on a background thread so it completes (and any
+        side effects such as caching happen) even if every reader stops early.
+        """
+        with self._lock:
+            call = self._streams.get(key)
+            if call is None:
+                call = self._streams[key] = _StreamCall()
+                self.stats['stream_executions'] += 1
+                threading.Thread(
+                    target=self._produce, args=(key, call, make_iterator), name="single-flight-stream", daemon=True
+                ).start()
+            else:
+                self.stats['stream_coalesced'] += 1
+
+        position = 0
+        while True:
+            with call.condition:
+                call.condition.wait_for(lambda: len(call.chunks) > position or call.finished)
+                chunks = call.chunks[position:]
+                finished = call.finished
+            for chunk in chunks:
+                yield chunk
+            position += len(chunks)
+            if finished and position == len(call.chunks):
+                if call.error is not None:
+                    raise call.error
+                return
+
+    def _produce(self, key, call, make_iterator):
+        try:
+            for chunk in make_iterator():
+                with call.condition:
+                    call.chunks.append(chunk)
+                    call.condition.notify_all()
+        except Exception as e:
+            call.error = e
+        finally:
+            with self._lock:
+                del self._streams[key]
+            with call.condition:
+                call.finished = True
+                call.condition.notify_all()
+
+    def get_stats(self):
+        with self._lock:
+            in_flight = len(self._calls) + len(self._streams)
+        total = self.stats['executions'] + self.stats['coalesced']
+        total += self.stats['stream_executions'] + self.stats['stream_coalesced']
+        coalesced = self.stats['coalesced'] + self.stats['stream_coalesced']
+        return {
+            **self.stats,
+            'in_flight': in_flight,
+            'coalesced_rate': coalesced / total if total else 0.0,
+        }
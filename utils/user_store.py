@@ -0,0 +1,347 @@
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no flock, fall back to the in-process lock only
+    fcntl = None
+
+# Columns of a user record, in storage order
+USER_FIELDS = ('password', 'email', 'plan', 'created_at', 'usage_count', 'max_uses', 'last_reset')
+
+
+@contextmanager
+def _file_lock(lock_file):
+    """Exclusive flock on lock_file (a no-op where fcntl isn't available)"""
+    if fcntl is None:
+        yield
+        return
+    with open(lock_file, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _with_defaults(user):
+    """A legacy record with every USER_FIELDS key set (older JSON files lack some of them)"""
+    now = datetime.now().isoformat()
+    record = {field: value for field, value in user.items() if value is not None}
+    record.setdefault('email', '')
+    record.setdefault('plan', 'free')
+    record.setdefault('created_at', now)
+    record.setdefault('usage_count', 0)
+    record.setdefault('max_uses', 5 if record['plan'] == 'free' else float('inf'))
+    record.setdefault('last_reset', record['created_at'])
+    return record
+
+
+class UserStore(ABC):
+    """Storage backend interface for AuthSystem.
+
+    Records are plain dicts with the keys in USER_FIELDS. Implementations must
+    make create() and increment_usage() atomic per user.
+    """
+
+    @abstractmethod
+    def get(self, username):
+        """Return a copy of the user's record, or None"""
+
+    def exists(self, username):
+        return self.get(username) is not None
+
+    @abstractmethod
+    def create(self, username, record):
+        """Insert a new user; returns False if the username is taken"""
+
+    @abstractmethod
+    def update(self, username, **fields):
+        """Set the given fields on one user; returns False if the user doesn't exist"""
+
+    @abstractmethod
+    def increment_usage(self, username):
+        """Add one to usage_count; returns False if the user doesn't exist"""
+
+    @abstractmethod
+    def usernames(self):
+        """All usernames"""
+
+    @abstractmethod
+    def count(self):
+        """Number of users"""
+
+
+class JSONUserStore(UserStore):
+    """Original storage: every user in one JSON file.
+
+    Safe to share between processes: writers hold an exclusive lock on a
+    sidecar .lock file, re-read any newer copy, then replace the file
+    atomically (write temp file + rename), so readers never see a partial
+    file and concurrent writers don't clobber each other's changes. The
+    in-memory copy is refreshed when the file's (mtime, inode, size)
+    signature changes, which costs one stat() per access.
+
+    With data_file=None the users only live in memory.
+    """
+
+    def __init__(self, data_file):
+        self.data_file = data_file
+        self.lock_file = data_file + '.lock' if data_file else None
+        self._lock = threading.Lock()
+        self._signature = None
+        self.load()
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.data_file)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+
+    def load(self):
+        self.users = {}
+        if self.data_file is None:
+            return
+        os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
+        with self._locked():
+            if os.path.exists(self.data_file):
+                self._reload()
+            else:
+                # Create initial file
+                self.save()
+
+    def _reload(self):
+        signature = self._file_signature()
+        with open(self.data_file, 'r') as f:
+            self.users = json.load(f)
+        self._signature = signature
+
+    def _refresh(self):
+        """Re-read the file only if another process (or worker) has replaced it"""
+        if self.data_file is None:
+            return
+        signature = self._file_signature()
+        if signature is not None and signature != self._signature:
+            self._reload()
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock across threads of this process and across processes"""
+        with self._lock:
+            if self.lock_file is None:
+                yield
+                return
+            with _file_lock(self.lock_file):
+                yield
+
+    def save(self):
+        """Atomically replace the file with the in-memory users (caller holds the lock)"""
+        if self.data_file is None:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.data_file), prefix='.users-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.users, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.data_file)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._signature = self._file_signature()
+
+    def _modify(self, username, change, must_exist=True):
+        """Run change(users) under the lock on fresh data, then persist it"""
+        with self._locked():
+            self._refresh()
+            if (username in self.users) != must_exist:
+                return False
+            change(self.users)
+            self.save()
+            return True
+
+    def get(self, username):
+        self._refresh()
+        user = self.users.get(username)
+        return dict(user) if user is not None else None
+
+    def create(self, username, record):
+        return self._modify(username, lambda users: users.__setitem__(username, dict(record)), must_exist=False)
+
+    def update(self, username, **fields):
+        return self._modify(username, lambda users: users[username].update(fields))
+
+    def increment_usage(self, username):
+        def increment(users):
+            users[username]['usage_count'] += 1
+        return self._modify(username, increment)
+
+    def usernames(self):
+        self._refresh()
+        return list(self.users)
+
+    def count(self):
+        self._refresh()
+        return len(self.users)
+
+
+class SQLiteUserStore(UserStore):
+    """SQLite (WAL mode) storage with single-row updates and an indexed username lookup"""
+
+    def __init__(self, db_file, migrate_from=None):
+        self.db_file = db_file
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                " username TEXT PRIMARY KEY,"
+                " password TEXT NOT NULL,"
+                " email TEXT NOT NULL,"
+                " plan TEXT NOT NULL DEFAULT 'free',"
+                " created_at TEXT NOT NULL,"
+                " usage_count INTEGER NOT NULL DEFAULT 0,"
+                " max_uses REAL NOT NULL,"
+                " last_reset TEXT NOT NULL)"
+            )
+
+        if migrate_from:
+            self.migrate_from_json(migrate_from)
+
+    def _connection(self):
+        """One connection per thread (Streamlit runs each session on its own thread)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=10)
+            conn.row_factory = sqlite3.Row
+            # WAL makes NORMAL durable enough and avoids an fsync per commit
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def migrate_from_json(self, json_file):
+        """Import users from the legacy JSON file once, then set the file aside.
+
+        Runs under the JSON store's lock file, so when several processes start
+        at once only the first migrates and the rest find the file gone.
+        Missing fields get the same defaults as a new account; users without a
+        password can't log in and are skipped.
+        """
+        with _file_lock(json_file + '.lock'):
+            try:
+                with open(json_file, 'r') as f:
+                    users = json.load(f)
+            except FileNotFoundError:
+                return 0
+
+            records = []
+            for username, user in users.items():
+                if not user.get('password'):
+                    print(f"⚠️ Skipping user {username!r} without a password in {json_file}")
+                    continue
+                record = _with_defaults(user)
+                records.append((username,) + tuple(record[field] for field in USER_FIELDS))
+
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO users (username, " + ", ".join(USER_FIELDS) + ")"
+                    " VALUES (?, " + ", ".join("?" for _ in USER_FIELDS) + ")",
+                    records,
+                )
+            os.replace(json_file, json_file + '.migrated')
+        print(f"✅ Migrated {len(records)} of {len(users)} users from {json_file} to SQLite")
+        return len(records)
+
+    def get(self, username):
+        row = self._connection().execute(
+            "SELECT " + ", ".join(USER_FIELDS) + " FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        if row is None:
+            return None
+        user = dict(row)
+        # max_uses is a REAL column (to hold infinity); hand back 5 rather than 5.0 like the JSON store
+        if user['max_uses'] != float('inf') and float(user['max_uses']).is_integer():
+            user['max_uses'] = int(user['max_uses'])
+        return user
+
+    def exists(self, username):
+        row = self._connection().execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone()
+        return row is not None
+
+    def create(self, username, record):
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO users (username, " + ", ".join(USER_FIELDS) + ")"
+                " VALUES (?, " + ", ".join("?" for _ in USER_FIELDS) + ")",
+                (username,) + tuple(record[field] for field in USER_FIELDS),
+            )
+        return cursor.rowcount == 1
+
+    def update(self, username, **fields):
+        unknown = set(fields) - set(USER_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown user fields: {sorted(unknown)}")
+        if not fields:
+            return self.exists(username)
+
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE users SET " + ", ".join(f"{field} = ?" for field in fields) + " WHERE username = ?",
+                tuple(fields.values()) + (username,),
+            )
+        return cursor.rowcount == 1
+
+    def increment_usage(self, username):
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE users SET usage_count = usage_count + 1 WHERE username = ?", (username,)
+            )
+        return cursor.rowcount == 1
+
+    def usernames(self):
+        return [row[0] for row in self._connection().execute("SELECT username FROM users")]
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+
+class UserMapping:
+    """Read-only dict-like view of a UserStore (keeps `username in auth.users` working)"""
+
+    def __init__(self, store):
+        self._store = store
+
+    def __contains__(self, username):
+        return self._store.exists(username)
+
+    def __getitem__(self, username):
+        user = self._store.get(username)
+        if user is None:
+            raise KeyError(username)
+        return user
+
+    def get(self, username, default=None):
+        user = self._store.get(username)
+        return user if user is not None else default
+
+    def __iter__(self):
+        return iter(self._store.usernames())
+
+    def __len__(self):
+        return self._store.count()
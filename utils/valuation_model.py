@@ -0,0 +1,209 @@
+import threading
+from datetime import date
+
+import numpy as np
+
+from utils.comps_store import PROPERTY_TYPES, encode_property_type
+
+
+class ValuationModel:
+    """Ridge regressions of log rent and log price on the stored comps.
+
+    Features are log sqft, bedrooms, bathrooms, age and a property-type
+    one-hot; missing features are filled with the training mean. The model
+    refits when the store has grown by refit_growth since the last fit, and
+    answers in well under a millisecond once fit, so it works as an offline
+    fallback and as an instant preliminary estimate.
+    """
+
+    def __init__(self, store, alpha=1.0, min_rows=10, refit_growth=0.1):
+        self.store = store
+        self.alpha = alpha
+        self.min_rows = min_rows
+        self.refit_growth = refit_growth
+        self._lock = threading.Lock()
+        self._fit_count = 0
+        self._models = {}
+        self._rent_per_sqft = {}
+
+    def _features(self, sqft, bedrooms, bathrooms, year_built, property_type, current_year):
+        """Design matrix (rows x features) before standardization; NaN marks a missing value"""
+        sqft = np.asarray(sqft, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_sqft = np.where(sqft > 0, np.log(sqft), np.nan)
+        age = current_year - np.asarray(year_built, dtype=float)
+        property_type = np.asarray(property_type, dtype=float)
+        # The first type is the baseline; an unknown type gets the mean of each dummy
+        type_columns = [
+            np.where(np.isnan(property_type), np.nan, property_type == code)
+            for code in range(1, len(PROPERTY_TYPES))
+        ]
+        return np.column_stack([log_sqft, bedrooms, bathrooms, age, *type_columns]).astype(float)
+
+    def _fit_target(self, features, target):
+        """Ridge fit of log(target) on the rows where it is known; None if there are too few"""
+        rows = np.isfinite(target) & (target > 0)
+        if rows.sum() < self.min_rows:
+            return None
+        X = features[rows]
+        means = np.nanmean(X, axis=0)
+        means = np.where(np.isfinite(means), means, 0.0)
+        X = np.where(np.isnan(X), means, X)
+        scales = X.std(axis=0)
+        scales = np.where(scales > 0, scales, 1.0)
+        X = (X - means) / scales
+        y = np.log(target[rows])
+
+        # The intercept is the mean of y; only the slopes are penalized
+        intercept = y.mean()
+        gram = X.T @ X + self.alpha * np.eye(X.shape[1])
+        weights = np.linalg.solve(gram, X.T @ (y - intercept))
+        residuals = y - intercept - X @ weights
+        dof = max(len(y) - X.shape[1] - 1, 1)
+        return {
+            'means': means,
+            'scales': scales,
+            'intercept': intercept,
+            'weights': weights,
+            'sigma': float(np.sqrt(residuals @ residuals / dof)),
+            'rows': int(len(y)),
+        }
+
+    def refresh(self):
+        """Refit if the store has grown enough since the last fit"""
+        count = self.store.count()
+        with self._lock:
+            if self._models and count < self._fit_count * (1 + self.refit_growth):
+                return
+            if not self._models and count == self._fit_count:
+                return
+            columns = self.store.columns(count)
+            current_year = date.today().year
+            features = self._features(
+                columns['sqft'], columns['bedrooms'], columns['bathrooms'], columns['year_built'],
+                columns['property_type'], current_year,
+            )
+            self._models = {
+                target: model
+                for target in ('rent', 'price')
+                for model in [self._fit_target(features, np.asarray(columns[target], dtype=float))]
+                if model is not None
+            }
+            # Typical rent per sqft by property type, for the demand signal
+            rent, sqft, types = (np.asarray(columns[name], dtype=float) for name in ('rent', 'sqft', 'property_type'))
+            valid = (rent > 0) & (sqft > 0)
+            self._rent_per_sqft = {
+                code: float(np.median(rent[valid & (types == code)] / sqft[valid & (types == code)]))
+                for code in range(len(PROPERTY_TYPES)) if np.any(valid & (types == code))
+            }
+            if valid.any():
+                self._rent_per_sqft[None] = float(np.median(rent[valid] / sqft[valid]))
+            self._fit_count = count
+
+    @property
+    def ready(self):
+        self.refresh()
+        return 'rent' in self._models
+
+    def predict(self, property_data):
+        """Predicted monthly rent and value with ~80% ranges; a target is None if it can't be fit"""
+        self.refresh()
+        features = self._features(
+            [property_data.get('square_feet') or 0],
+            [property_data.get('bedrooms') or np.nan],
+            [property_data.get('bathrooms') or np.nan],
+            [_as_year(property_data.get('year_built'))],
+            [encode_property_type(property_data.get('property_type'))],
+            date.today().year,
+        )[0]
+        prediction = {}
+        for target in ('rent', 'price'):
+            model = self._models.get(target)
+            if model is None:
+                prediction[target] = None
+                continue
+            x = (np.where(np.isnan(features), model['means'], features) - model['means']) / model['scales']
+            log_value = model['intercept'] + x @ model['weights']
+            # exp of the log-scale mean is the median; 1.28 sigma either side covers ~80%
+            prediction[target] = float(np.exp(log_value))
+            prediction[f'{target}_range'] = (
+                float(np.exp(log_value - 1.28 * model['sigma'])),
+                float(np.exp(log_value + 1.28 * model['sigma'])),
+            )
+            prediction[f'{target}_rows'] = model['rows']
+        return prediction
+
+    def estimate(self, property_data, comps_data=None):
+        """Offline metrics in the same shape as PropertyAIAnalyzer.extract_metrics (None if unfit).
+
+        Rent comes from the user's comps when they give one (they are the
+        closest evidence), otherwise from the regression.
+        """
+        from utils.metrics_engine import compute_property_metrics
+
+        prediction = self.predict(property_data)
+        local = compute_property_metrics(property_data, comps_data or {})
+        rent = local['implied_rent'] or prediction['rent']
+        if rent is None:
+            return None
+        price = property_data.get('purchase_price') or 0
+        gross_yield = rent * 12 / price * 100 if price > 0 else None
+
+        # Demand: predicted rent per sqft against the typical rent per sqft for this type
+        demand = 'See analysis'
+        sqft = property_data.get('square_feet') or 0
+        typical = self._rent_per_sqft.get(
+            encode_property_type(property_data.get('property_type')), self._rent_per_sqft.get(None)
+        )
+        if prediction['rent'] and sqft > 0 and typical:
+            ratio = prediction['rent'] / sqft / typical
+            demand = 'High' if ratio >= 1.1 else 'Low' if ratio <= 0.9 else 'Medium'
+
+        # Potential: purchase price against the predicted market value
+        potential = 'See analysis'
+        if prediction['price'] and price > 0:
+            discount = price / prediction['price']
+            potential = 'Good' if discount <= 0.95 else 'Poor' if discount >= 1.05 else 'Fair'
+
+        return {
+            'rental_value': f"${rent:,.0f}/mo",
+            'yield': f"{gross_yield:.1f}%" if gross_yield is not None else 'See analysis',
+            'demand': demand,
+            'flip_potential': potential,
+            'prediction': prediction,
+        }
+
+    def analysis_text(self, property_data, comps_data=None):
+        """Short markdown analysis from estimate(), or None when there isn't enough data"""
+        metrics = self.estimate(property_data, comps_data)
+        if metrics is None:
+            return None
+        prediction = metrics['prediction']
+        # Worded so extract_metrics reads the same fields back out of the text
+        lines = [
+            "**Offline estimate** (computed instantly from saved comparable properties, no AI service used)",
+            "",
+            f"- **Estimated Rental Value**: {metrics['rental_value'].replace('/mo', '')} per month",
+        ]
+        if metrics['yield'] != 'See analysis':
+            lines.append(f"- **Gross Rental Yield**: {metrics['yield']} yield")
+        if metrics['demand'] != 'See analysis':
+            lines.append(f"- **Market Demand**: {metrics['demand']} demand")
+        if metrics['flip_potential'] != 'See analysis':
+            lines.append(f"- **Investment Recommendation**: {metrics['flip_potential']} opportunity "
+                         f"at this price")
+        if prediction.get('rent_range'):
+            low, high = prediction['rent_range']
+            lines.append(f"\nComparable rents suggest ${low:,.0f} to ${high:,.0f} per month "
+                         f"(model fit on {prediction['rent_rows']:,} saved properties).")
+        if prediction.get('price_range'):
+            low, high = prediction['price_range']
+            lines.append(f"Estimated market value: ${prediction['price']:,.0f} (${low:,.0f} to ${high:,.0f}).")
+        return "\n".join(lines)
+
+
+def _as_year(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan